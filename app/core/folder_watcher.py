@@ -0,0 +1,310 @@
+import os
+import time
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.core.subtitle_processor import SubtitleProcessor, TranslationRun, SUBTITLE_EXTENSIONS
+from app.core.subtitle_formats import is_binary_subtitle_file
+
+class FolderWatcher:
+    """文件夹监视类，轮询发现新增或修改的字幕文件并在原目录输出译文"""
+    def __init__(self, folder, translation_api, target_language="zh", poll_interval=2.0,
+                 settle_time=2.0, max_workers=4, recursive=False, on_done=None, on_error=None, run=None,
+                 retry_delay=5.0, max_retry_delay=300.0):
+        """初始化文件夹监视器
+        Args:
+            folder: 监视的文件夹路径
+            translation_api: 翻译API实例
+            target_language: 目标语言代码
+            poll_interval: 轮询间隔秒数
+            settle_time: 文件大小和修改时间保持不变多少秒后才处理
+            max_workers: 同时翻译的文件数
+            recursive: 是否监视子文件夹
+            on_done: 文件翻译完成的回调，参数为(源文件路径, 输出路径, 字符计费报告)
+            on_error: 文件处理失败的回调，参数为(源文件路径, 异常)
+            run: 所有文件共享的翻译任务(TranslationRun)，用于整体字符预算与累计报告，None时自动创建不限预算的任务
+            retry_delay: 翻译或导出失败后首次重试前等待的秒数，之后每次失败加倍
+            max_retry_delay: 重试等待的最长秒数
+        Raises:
+            Exception: 文件夹不存在时抛出异常
+        """
+        # 所有文件共用同一个翻译API实例，修改过的文件按上次结果增量翻译，未变化的字幕不再请求
+        if not os.path.isdir(folder):
+            raise Exception(f"目录不存在: {folder}")
+        
+        self.folder = folder
+        self.translation_api = translation_api
+        self.target_language = target_language
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.recursive = recursive
+        self.on_done = on_done
+        self.on_error = on_error
+        self.run = run if run is not None else TranslationRun()
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        
+        # 文件索引：路径 -> (修改时间, 大小, 首次观察到该状态的时间)
+        self._index = {}
+        # 已处理的文件：路径 -> (修改时间, 大小, 内容哈希)
+        self._processed = {}
+        # 上次翻译的结果：路径 -> 原文到译文的映射，用于增量翻译；重启后从状态文件恢复
+        self._previous = {}
+        # 等待重试的文件：路径 -> (连续失败次数, 可以重试的时间)
+        self._retries = {}
+        # 已提交但尚未处理完成的文件
+        self._queued = set()
+        # 保护以上各表，扫描线程与工作线程都会读写
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        
+    def output_path_for(self, file_path):
+        """获取字幕文件对应的译文输出路径
+        Args:
+            file_path: 源字幕文件路径
+        Returns:
+            str: 与源文件同目录、以目标语言代码为后缀的输出路径
+        """
+        root, ext = os.path.splitext(file_path)
+        return f"{root}.{self.target_language}{ext}"
+        
+    def state_path_for(self, file_path):
+        """获取字幕文件对应的状态文件路径，状态文件记录上次翻译的原文内容哈希与逐条译文
+        Args:
+            file_path: 源字幕文件路径
+        Returns:
+            str: 译文输出路径加.json后缀
+        """
+        return f"{self.output_path_for(file_path)}.json"
+        
+    def scan(self):
+        """扫描一次文件夹，将已稳定的新增或修改文件提交翻译
+        Returns:
+            list: 本次提交翻译的文件路径
+        """
+        files = list(self._iter_subtitle_files())
+        now = time.monotonic()
+        submitted = []
+        seen = set()
+        with self._lock:
+            for file_path, stat in files:
+                seen.add(file_path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                entry = self._index.get(file_path)
+                if entry is None and self._has_fresh_output(file_path, stat):
+                    # 启动前已翻译过且译文比源文件新，视为已处理
+                    self._processed[file_path] = signature + (None,)
+                if entry is None or entry[:2] != signature:
+                    self._index[file_path] = signature + (now,)
+                    # 文件变化后立即按新内容处理，不再等待上次失败的重试时间
+                    self._retries.pop(file_path, None)
+                    if self._is_binary(file_path):
+                        # VobSub等二进制字幕无法翻译，文件再次变化前不再处理
+                        self._processed[file_path] = signature + (None,)
+                    continue
+                # 大小和修改时间稳定一段时间后才处理，避免读取未写完的文件
+                if now - entry[2] < self.settle_time:
+                    continue
+                processed = self._processed.get(file_path)
+                if processed is not None and processed[:2] == signature:
+                    continue
+                retry = self._retries.get(file_path)
+                if retry is not None and now < retry[1]:
+                    continue
+                if file_path in self._queued:
+                    continue
+                self._queued.add(file_path)
+                self._executor.submit(self._process_file, file_path, signature)
+                submitted.append(file_path)
+            
+            # 清理已删除文件的索引
+            for file_path in list(self._index):
+                if file_path not in seen:
+                    del self._index[file_path]
+                    self._processed.pop(file_path, None)
+                    self._previous.pop(file_path, None)
+                    self._retries.pop(file_path, None)
+        return submitted
+        
+    def run_forever(self):
+        """持续轮询文件夹，直到调用stop"""
+        while not self._stop_event.is_set():
+            self.scan()
+            self._stop_event.wait(self.poll_interval)
+        
+    def stop(self, wait=True):
+        """停止监视
+        Args:
+            wait: 是否等待正在翻译的文件处理完成
+        """
+        self._stop_event.set()
+        self._executor.shutdown(wait=wait)
+        
+    def _iter_subtitle_files(self):
+        """遍历监视文件夹中的字幕文件，跳过本监视器生成的译文
+        Yields:
+            tuple: (文件路径, os.stat_result)
+        """
+        output_suffixes = tuple(f".{self.target_language}{ext}" for ext in SUBTITLE_EXTENSIONS)
+        stack = [self.folder]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        stack.append(entry.path)
+                    continue
+                name = entry.name.lower()
+                if not name.endswith(SUBTITLE_EXTENSIONS) or name.endswith(output_suffixes):
+                    continue
+                try:
+                    yield entry.path, entry.stat()
+                except OSError:
+                    continue
+        
+    def _is_binary(self, file_path):
+        """判断字幕文件是否为二进制字幕，如与MicroDVD共用.sub扩展名的VobSub
+        Args:
+            file_path: 字幕文件路径
+        Returns:
+            bool: 是二进制内容时返回True，无法读取时返回False，留待处理时报告错误
+        """
+        try:
+            return is_binary_subtitle_file(file_path)
+        except OSError:
+            return False
+        
+    def _has_fresh_output(self, file_path, stat):
+        """判断字幕文件是否已有比它更新的译文
+        Args:
+            file_path: 源字幕文件路径
+            stat: 源文件的os.stat_result
+        Returns:
+            bool: 译文存在且修改时间不早于源文件时返回True
+        """
+        try:
+            return os.stat(self.output_path_for(file_path)).st_mtime_ns >= stat.st_mtime_ns
+        except OSError:
+            return False
+        
+    def _process_file(self, file_path, signature):
+        """翻译单个字幕文件并输出到原目录
+        Args:
+            file_path: 源字幕文件路径
+            signature: 提交时文件的(修改时间, 大小)
+        """
+        try:
+            try:
+                with open(file_path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                with self._lock:
+                    processed = self._processed.get(file_path)
+                    previous = self._previous.get(file_path)
+                if previous is None:
+                    # 重启后内存中没有上次的结果，从状态文件恢复
+                    state = self._load_state(file_path)
+                    if state is not None:
+                        previous = state["translations"]
+                        if state.get("source_hash") == digest and os.path.exists(self.output_path_for(file_path)):
+                            # 上次已翻译过相同内容且译文仍在
+                            processed = signature + (digest,)
+                if processed is not None and processed[2] == digest:
+                    # 仅修改时间变化，内容与上次处理相同
+                    self._record_result(file_path, signature + (digest,), previous)
+                    return
+                
+                processor = SubtitleProcessor()
+                processor.set_run(self.run)
+                processor.load_subtitle(file_path)
+                if not processor.subtitle_data:
+                    raise Exception(f"没有可翻译的字幕: {file_path}")
+            except Exception as e:
+                # 读取或解析失败，文件再次变化后才重试，避免每次轮询重复失败
+                self._record_result(file_path, signature + (None,), None)
+                if self.on_error:
+                    self.on_error(file_path, e)
+                return
+            
+            try:
+                if previous is not None:
+                    # 只翻译新增或修改的字幕，其余复用上次的译文
+                    processor.translate_incremental(self.translation_api, self.target_language, previous)
+                else:
+                    processor.translate_subtitle(self.translation_api, self.target_language)
+                output_path = processor.export_subtitle(self.output_path_for(file_path))
+                translations = processor.translation_map()
+                self._save_state(file_path, digest, translations)
+            except Exception as e:
+                # 网络、API或写出错误通常是暂时的，按退避时间稍后重试
+                self._schedule_retry(file_path)
+                if self.on_error:
+                    self.on_error(file_path, e)
+                return
+            
+            self._record_result(file_path, signature + (digest,), translations)
+            if self.on_done:
+                self.on_done(file_path, output_path, processor.last_report)
+        finally:
+            with self._lock:
+                self._queued.discard(file_path)
+                
+    def _record_result(self, file_path, processed, previous):
+        """记录文件的处理结果，处理期间已被删除的文件不再写回
+        Args:
+            file_path: 源字幕文件路径
+            processed: (修改时间, 大小, 内容哈希)，内容哈希为None表示解析失败
+            previous: 原文到译文的映射，None表示保留原有记录
+        """
+        with self._lock:
+            if file_path not in self._index:
+                return
+            self._processed[file_path] = processed
+            self._retries.pop(file_path, None)
+            if previous is not None:
+                self._previous[file_path] = previous
+                
+    def _schedule_retry(self, file_path):
+        """记录一次可重试的失败，等待时间随连续失败次数加倍
+        Args:
+            file_path: 源字幕文件路径
+        """
+        with self._lock:
+            if file_path not in self._index:
+                return
+            attempts = self._retries.get(file_path, (0, 0))[0] + 1
+            delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+            self._retries[file_path] = (attempts, time.monotonic() + delay)
+            
+    def _load_state(self, file_path):
+        """读取字幕文件的状态文件
+        Args:
+            file_path: 源字幕文件路径
+        Returns:
+            dict: 包含source_hash与translations的状态，不存在或无法读取时返回None
+        """
+        try:
+            with open(self.state_path_for(file_path), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or not isinstance(state.get("translations"), dict):
+            return None
+        return state
+        
+    def _save_state(self, file_path, digest, translations):
+        """写入字幕文件的状态文件，先写临时文件再替换，避免中断时留下不完整的状态
+        Args:
+            file_path: 源字幕文件路径
+            digest: 源文件内容哈希
+            translations: 原文到译文的映射
+        """
+        state_path = self.state_path_for(file_path)
+        temp_path = f"{state_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"source_hash": digest, "translations": translations}, f, ensure_ascii=False)
+        os.replace(temp_path, state_path)
@@ -0,0 +1,487 @@
+import re
+import abc
+import codecs
+import pysrt
+from app.core.subtitle_timing import to_milliseconds, format_srt_time, format_vtt_time, format_ass_time
+
+# 编码检测只读取文件开头的这部分字节
+ENCODING_PREFIX_SIZE = 64 * 1024
+# 格式嗅探只检查文本开头的这部分字符
+SNIFF_PREFIX_SIZE = 4096
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# 二进制字幕（如VobSub的.sub）以MPEG-PS包头开始
+_BINARY_SIGNATURES = (b"\x00\x00\x01\xba",)
+# 平假名与全角片假名，日文文本中占比很高
+_KANA = re.compile(r"[\u3040-\u30ff]")
+# 半角片假名，GBK文本按Shift-JIS解码时大量出现
+_HALFWIDTH_KATAKANA = re.compile(r"[\uff61-\uff9f]")
+_NON_ASCII_RUNS = re.compile(r"[^\x00-\x7f]+")
+
+def detect_encoding(data, prefix_size=ENCODING_PREFIX_SIZE):
+    """根据文件开头的字节检测文本编码
+    依次检查BOM、UTF-8、Shift-JIS与GB18030，多字节编码都无法合理解码时才按单字节西文编码处理
+    Args:
+        data: 文件内容bytes
+        prefix_size: 参与检测的最大字节数
+    Returns:
+        str: 编码名称
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+    
+    prefix = data[:prefix_size]
+    # 截断处可能切断多字节字符，使用增量解码器忽略末尾不完整的字符
+    final = len(data) <= prefix_size
+    if _can_decode(prefix, "utf-8", final):
+        return "utf-8"
+    
+    # Shift-JIS的第二字节可能落在ASCII范围，不能根据高位字节是否成对判断是否为单字节编码
+    sjis_text = _decode_or_none(prefix, "cp932", final)
+    gb_text = _decode_or_none(prefix, "gb18030", final)
+    if sjis_text is not None and _looks_japanese(sjis_text, gb_text):
+        return "cp932"
+    if gb_text is not None and not _mostly_isolated(gb_text):
+        return "gb18030"
+    return "cp1252" if _can_decode(prefix, "cp1252", final) else "latin-1"
+
+def _looks_japanese(sjis_text, gb_text):
+    """判断按Shift-JIS解码的文本是否比按GB18030解码更可信
+    Args:
+        sjis_text: 按cp932解码的文本
+        gb_text: 按gb18030解码的文本，无法解码时为None
+    Returns:
+        bool: 应按Shift-JIS处理时返回True
+    """
+    non_ascii = sum(1 for ch in sjis_text if ch > "\x7f")
+    if not non_ascii:
+        return False
+    # 含假名的文本直接判定为日文
+    if len(_KANA.findall(sjis_text)) * 10 > non_ascii:
+        return True
+    # 只有汉字时，GBK中文按Shift-JIS解码会出现大量半角片假名，
+    # 日文汉字按GBK解码则多落在GB2312之外的扩展区
+    if len(_HALFWIDTH_KATAKANA.findall(sjis_text)) * 2 >= non_ascii:
+        return False
+    if _mostly_isolated(sjis_text):
+        return False
+    return gb_text is None or not _mostly_gb2312(gb_text)
+
+def _mostly_isolated(text):
+    """判断文本中的非ASCII字符是否大多孤立地夹在ASCII字符之间
+    西文单字节编码的高位字节后接字母时也能按双字节编码解出汉字，但中日文的汉字通常连续出现
+    """
+    runs = _NON_ASCII_RUNS.findall(text)
+    return sum(1 for run in runs if len(run) == 1) * 2 > len(runs)
+
+def _mostly_gb2312(text):
+    """判断文本中的非ASCII字符是否绝大多数属于GB2312常用字符集"""
+    chars = [ch for ch in text if ch > "\x7f"]
+    common = 0
+    for ch in chars:
+        try:
+            ch.encode("gb2312")
+            common += 1
+        except UnicodeEncodeError:
+            pass
+    return common * 10 >= len(chars) * 9
+
+def decode_subtitle(data):
+    """将字幕文件内容严格解码为文本
+    先按文件开头检测编码，开头之后出现无法解码的字节时再按完整内容重新检测
+    Args:
+        data: 文件内容bytes
+    Returns:
+        str: 解码后的文本
+    """
+    try:
+        return data.decode(detect_encoding(data))
+    except UnicodeDecodeError:
+        return data.decode(detect_encoding(data, prefix_size=len(data)))
+
+def is_binary_subtitle(data):
+    """判断文件内容是否为二进制字幕，如与MicroDVD共用.sub扩展名的VobSub
+    Args:
+        data: 文件开头的bytes
+    Returns:
+        bool: 是二进制内容时返回True
+    """
+    if data.startswith(_BINARY_SIGNATURES):
+        return True
+    if any(data.startswith(bom) for bom, _ in _BOMS):
+        return False
+    # UTF-16文本带BOM，无BOM的文本字幕不会出现空字节
+    return b"\x00" in data[:SNIFF_PREFIX_SIZE]
+
+def is_binary_subtitle_file(file_path):
+    """判断字幕文件是否为二进制字幕，只读取文件开头
+    Args:
+        file_path: 字幕文件路径
+    Returns:
+        bool: 是二进制内容时返回True
+    Raises:
+        OSError: 文件无法读取时抛出异常
+    """
+    with open(file_path, 'rb') as f:
+        return is_binary_subtitle(f.read(SNIFF_PREFIX_SIZE))
+
+def _decode_or_none(data, encoding, final):
+    """尝试严格解码
+    Args:
+        data: 待解码的bytes
+        encoding: 编码名称
+        final: 是否为完整数据，False时忽略末尾不完整的字符
+    Returns:
+        解码后的文本，失败时返回None
+    """
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(data, final)
+    except UnicodeDecodeError:
+        return None
+
+def _can_decode(data, encoding, final):
+    """判断数据能否按指定编码严格解码"""
+    return _decode_or_none(data, encoding, final) is not None
+
+def _output_text(subtitle):
+    """获取导出时使用的文本，已翻译时使用译文"""
+    return subtitle.translated_text if hasattr(subtitle, 'translated_text') else subtitle.text
+
+def _split_blocks(text):
+    """按空行切分文本块，统一换行符"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return [block.strip("\n") for block in re.split(r"\n[ \t]*\n", text) if block.strip()]
+
+class SubtitleCue:
+    """通用字幕条目，时间以毫秒整数表示，文本中的换行统一为\\n"""
+    def __init__(self, start, end, text, header=None, footer=None, extra_events=None, **fields):
+        """初始化字幕条目
+        Args:
+            start: 开始时间毫秒数
+            end: 结束时间毫秒数
+            text: 字幕文本
+            header: 源文件中字幕之前的内容，如ASS的脚本信息与样式、WebVTT的文件头，同一文件的字幕共享
+            footer: 源文件中字幕之后的内容，如ASS事件之后的[Fonts]等段落，同一文件的字幕共享
+            extra_events: 源文件中紧邻该条之前、不需要翻译的事件行，如ASS的Comment
+            fields: 格式相关的其他字段，如ASS的Style、WebVTT的设置等
+        """
+        self.start = start
+        self.end = end
+        self.text = text
+        self.header = header
+        self.footer = footer
+        self.extra_events = extra_events or []
+        self.fields = fields
+
+class SubtitleFormat(abc.ABC):
+    """字幕格式基类，子类实现嗅探、读取和写入"""
+    name = ""
+    extensions = ()
+        
+    def sniff(self, text):
+        """根据文本开头判断是否为该格式
+        Args:
+            text: 文件开头的文本
+        Returns:
+            bool: 是该格式时返回True
+        """
+        return False
+        
+    @abc.abstractmethod
+    def read(self, text):
+        """解析字幕文本
+        Args:
+            text: 完整的字幕文本
+        Returns:
+            解析后的字幕数据
+        """
+        
+    @abc.abstractmethod
+    def write(self, subtitle_data, output_path):
+        """写入字幕文件
+        Args:
+            subtitle_data: 字幕数据
+            output_path: 输出文件路径
+        """
+
+class SrtFormat(SubtitleFormat):
+    """SRT格式"""
+    name = "SRT"
+    extensions = (".srt",)
+    _SNIFF = re.compile(r"^\s*\d+[ \t]*\r?\n[ \t]*\d+:\d{2}:\d{2}[,.]\d{1,3}\s*-->")
+        
+    def sniff(self, text):
+        return bool(self._SNIFF.match(text))
+        
+    def read(self, text):
+        return pysrt.from_string(text)
+        
+    def write(self, subtitle_data, output_path):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for i, subtitle in enumerate(subtitle_data):
+                f.write(f"{i+1}\n")
+                f.write(f"{format_srt_time(to_milliseconds(subtitle.start))} --> {format_srt_time(to_milliseconds(subtitle.end))}\n")
+                f.write(f"{_output_text(subtitle)}\n")
+                f.write("\n")
+
+class VttFormat(SubtitleFormat):
+    """WebVTT格式"""
+    name = "WebVTT"
+    extensions = (".vtt",)
+        
+    def sniff(self, text):
+        return text.startswith("WEBVTT")
+        
+    def read(self, text):
+        subtitle_data = []
+        # 第一条字幕之前的文件头、样式与区域定义，导出时原样写回
+        header_blocks = []
+        for block in _split_blocks(text):
+            lines = block.split("\n")
+            if lines[0].startswith(("WEBVTT", "NOTE", "STYLE", "REGION")):
+                if not subtitle_data:
+                    header_blocks.append(block)
+                continue
+            # 时间行之前可以有一行可选的字幕标识
+            timing_index = 0 if "-->" in lines[0] else 1
+            if timing_index >= len(lines) or "-->" not in lines[timing_index]:
+                continue
+            start, rest = lines[timing_index].split("-->", 1)
+            rest = rest.split(None, 1)
+            subtitle_data.append(SubtitleCue(
+                to_milliseconds(start),
+                to_milliseconds(rest[0]),
+                "\n".join(lines[timing_index + 1:]),
+                header="\n\n".join(header_blocks),
+                identifier=lines[0] if timing_index else "",
+                settings=rest[1] if len(rest) > 1 else ""
+            ))
+        return subtitle_data
+        
+    def write(self, subtitle_data, output_path):
+        header = getattr(subtitle_data[0], "header", None) if subtitle_data else None
+        if not header or not header.startswith("WEBVTT"):
+            header = "WEBVTT"
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(f"{header}\n\n")
+            for subtitle in subtitle_data:
+                fields = getattr(subtitle, "fields", {})
+                settings = fields.get("settings", "")
+                if fields.get("identifier"):
+                    f.write(f"{fields['identifier']}\n")
+                f.write(f"{format_vtt_time(to_milliseconds(subtitle.start))} --> {format_vtt_time(to_milliseconds(subtitle.end))}")
+                f.write(f" {settings}\n" if settings else "\n")
+                f.write(f"{_output_text(subtitle)}\n")
+                f.write("\n")
+
+class AssFormat(SubtitleFormat):
+    """ASS（SSA v4+）格式"""
+    name = "ASS"
+    extensions = (".ass",)
+    # 未提供Format行时使用的默认事件字段
+    _DEFAULT_FIELDS = ["Layer", "Start", "End", "Style", "Name", "MarginL", "MarginR", "MarginV", "Effect", "Text"]
+    _SCRIPT_TYPE = "v4.00+"
+    _STYLES_SECTION = "[V4+ Styles]"
+    _STYLE_FORMAT = "Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding"
+    _STYLE = "Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1"
+    # 字幕条目缺少某个事件字段时写入的值
+    _FIELD_DEFAULTS = {"Layer": "0", "Marked": "Marked=0", "Style": "Default", "Name": "",
+                       "MarginL": "0", "MarginR": "0", "MarginV": "0", "Effect": ""}
+        
+    def sniff(self, text):
+        lowered = text.lower()
+        return "[script info]" in lowered and ("[v4+ styles]" in lowered or "v4.00+" in lowered)
+        
+    def read(self, text):
+        subtitle_data = []
+        in_events = False
+        # 事件之前的脚本信息与样式、事件之后的[Fonts]等段落，导出同一格式时原样写回
+        header_lines = []
+        footer_lines = []
+        header = None
+        # 尚未归属到某条对话的Comment等事件
+        extra_events = []
+        fields = self._DEFAULT_FIELDS
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if line.startswith("["):
+                in_events = line.lower() == "[events]"
+                if in_events and header is None:
+                    header = "\n".join(header_lines).strip("\n")
+                elif not in_events:
+                    (header_lines if header is None else footer_lines).append(raw_line)
+                continue
+            if not in_events:
+                (header_lines if header is None else footer_lines).append(raw_line)
+                continue
+            if line.startswith("Format:"):
+                fields = [field.strip() for field in line[len("Format:"):].split(",")]
+                continue
+            if not line:
+                continue
+            event_type, _, body = line.partition(":")
+            if not body:
+                # 分号开头的注释等无法解析的行原样保留
+                extra_events.append(line)
+                continue
+            parts = body.lstrip().split(",", len(fields) - 1)
+            if len(parts) < len(fields):
+                extra_events.append(line)
+                continue
+            values = dict(zip(fields, parts))
+            if event_type != "Dialogue":
+                # Comment等事件不翻译，按导出时的字段顺序重新排列后保留
+                extra_events.append(f"{event_type}: {self._join_fields(values)}")
+                continue
+            subtitle_data.append(SubtitleCue(
+                to_milliseconds(values.pop("Start")),
+                to_milliseconds(values.pop("End")),
+                values.pop("Text").replace("\\N", "\n"),
+                header=header,
+                extra_events=extra_events,
+                **values
+            ))
+            extra_events = []
+        
+        # 最后一条对话之后的事件紧接着写出，之后的段落与事件之间空一行
+        sections = "\n".join(footer_lines).strip("\n")
+        footer = "\n".join(extra_events + (["", sections] if sections else []))
+        for subtitle in subtitle_data:
+            subtitle.footer = footer
+        return subtitle_data
+        
+    def write(self, subtitle_data, output_path):
+        # 源文件为同一格式时保留其脚本信息、样式、Comment事件与事件之后的段落
+        source = subtitle_data[0] if subtitle_data and self._is_same_format(subtitle_data[0]) else None
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(f"{source.header if source else self._default_header()}\n\n")
+            f.write("[Events]\n")
+            f.write(f"Format: {', '.join(self._DEFAULT_FIELDS)}\n")
+            
+            for subtitle in subtitle_data:
+                if source:
+                    for event in getattr(subtitle, "extra_events", ()):
+                        f.write(f"{event}\n")
+                values = dict(getattr(subtitle, "fields", {}))
+                values["Start"] = format_ass_time(to_milliseconds(subtitle.start))
+                values["End"] = format_ass_time(to_milliseconds(subtitle.end))
+                values["Text"] = _output_text(subtitle).replace("\n", "\\N")
+                f.write(f"Dialogue: {self._join_fields(values)}\n")
+            
+            if source and source.footer:
+                f.write(f"{source.footer}\n")
+                
+    def _join_fields(self, values):
+        """按导出时的事件字段顺序拼接字段值，缺少的字段使用默认值
+        Args:
+            values: 字段名到字段值的映射
+        Returns:
+            str: 逗号分隔的字段值
+        """
+        return ",".join(values.get(field, self._FIELD_DEFAULTS.get(field, "")) for field in self._DEFAULT_FIELDS)
+        
+    def _is_same_format(self, subtitle):
+        """判断字幕是否读取自与导出格式相同的文件，只有这时才能原样写回源文件的其他内容
+        Args:
+            subtitle: 字幕条目
+        Returns:
+            bool: 源文件样式段与导出格式一致时返回True
+        """
+        header = getattr(subtitle, "header", None)
+        return bool(header) and self._STYLES_SECTION.lower() in header.lower()
+        
+    def _default_header(self):
+        """生成只含Default样式的默认脚本信息与样式
+        Returns:
+            str: 事件之前的文本
+        """
+        return "\n".join([
+            "[Script Info]",
+            "Title: SubtitleTranslate Export",
+            f"ScriptType: {self._SCRIPT_TYPE}",
+            "WrapStyle: 0",
+            "",
+            self._STYLES_SECTION,
+            f"Format: {self._STYLE_FORMAT}",
+            f"Style: {self._STYLE}",
+        ])
+
+class SsaFormat(AssFormat):
+    """SSA v4格式"""
+    name = "SSA"
+    extensions = (".ssa",)
+    _DEFAULT_FIELDS = ["Marked", "Start", "End", "Style", "Name", "MarginL", "MarginR", "MarginV", "Effect", "Text"]
+    _SCRIPT_TYPE = "v4.00"
+    _STYLES_SECTION = "[V4 Styles]"
+    _STYLE_FORMAT = "Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, TertiaryColour, BackColour, Bold, Italic, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, AlphaLevel, Encoding"
+    _STYLE = "Default,Arial,20,16777215,255,0,0,0,0,1,2,2,2,10,10,10,0,1"
+        
+    def sniff(self, text):
+        lowered = text.lower()
+        return "[script info]" in lowered and ("[v4 styles]" in lowered or re.search(r"scripttype:\s*v4\.00\s*$", lowered, re.M) is not None)
+
+class MicroDvdFormat(SubtitleFormat):
+    """MicroDVD（SUB）格式，时间以帧号表示"""
+    name = "MicroDVD"
+    extensions = (".sub",)
+    _LINE = re.compile(r"^\{(\d+)\}\{(\d*)\}(.*)$")
+        
+    def __init__(self, fps=23.976):
+        """初始化MicroDVD格式
+        Args:
+            fps: 文件未声明帧率时使用的帧率
+        """
+        self.fps = fps
+        
+    def sniff(self, text):
+        first_line = text.lstrip().split("\n", 1)[0]
+        return bool(self._LINE.match(first_line.strip()))
+        
+    def read(self, text):
+        subtitle_data = []
+        fps = self.fps
+        for i, line in enumerate(text.splitlines()):
+            match = self._LINE.match(line.strip())
+            if not match:
+                continue
+            start, end, content = match.groups()
+            # 首行形如{1}{1}23.976时为帧率声明
+            if i == 0 and start == end == "1":
+                try:
+                    fps = float(content)
+                    continue
+                except ValueError:
+                    pass
+            start_ms = round(int(start) * 1000 / fps)
+            end_ms = round(int(end) * 1000 / fps) if end else start_ms
+            subtitle_data.append(SubtitleCue(start_ms, end_ms, content.replace("|", "\n"), fps=fps))
+        if not subtitle_data:
+            raise Exception("未找到MicroDVD字幕内容")
+        return subtitle_data
+        
+    def write(self, subtitle_data, output_path):
+        # 沿用源文件的帧率，其他格式转换而来时使用默认帧率
+        fps = getattr(subtitle_data[0], "fields", {}).get("fps", self.fps) if subtitle_data else self.fps
+        with open(output_path, 'w', encoding='utf-8') as f:
+            # 首行写入帧率声明，读取时无需再指定帧率
+            f.write(f"{{1}}{{1}}{fps:g}\n")
+            for subtitle in subtitle_data:
+                start = round(to_milliseconds(subtitle.start) * fps / 1000)
+                end = round(to_milliseconds(subtitle.end) * fps / 1000)
+                text = _output_text(subtitle).replace("\n", "|")
+                f.write(f"{{{start}}}{{{end}}}{text}\n")
+
+def default_formats():
+    """创建默认支持的字幕格式列表，嗅探时按列表顺序匹配
+    Returns:
+        list: SubtitleFormat实例列表
+    """
+    return [VttFormat(), AssFormat(), SsaFormat(), SrtFormat(), MicroDvdFormat()]
+
+# 支持的字幕文件扩展名
+SUBTITLE_EXTENSIONS = tuple(ext for subtitle_format in default_formats() for ext in subtitle_format.extensions)
@@ -1,14 +1,23 @@
 import os
-import pysrt
+from app.core.subtitle_formats import default_formats, decode_subtitle, is_binary_subtitle, SNIFF_PREFIX_SIZE
 
 class SubtitleParser:
     """字幕解析器类，用于解析不同格式的字幕文件"""
     def __init__(self):
         """初始化字幕解析器"""
-        pass
+        # 已注册的字幕格式，嗅探时按顺序匹配
+        self.formats = default_formats()
+        
+    def register_format(self, subtitle_format):
+        """注册字幕格式，新注册的格式优先匹配
+        Args:
+            subtitle_format: SubtitleFormat实例
+        """
+        self.formats.insert(0, subtitle_format)
         
     def parse_file(self, file_path):
         """解析字幕文件
+        先检测文件编码并严格解码，再根据文件开头的内容识别格式，无法识别时按扩展名处理
         Args:
             file_path: 字幕文件路径
         Returns:
@@ -19,132 +28,60 @@ class SubtitleParser:
         if not os.path.exists(file_path):
             raise Exception(f"文件不存在: {file_path}")
         
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext == ".srt":
-            return self._parse_srt(file_path)
-        elif file_ext == ".ass":
-            return self._parse_ass(file_path)
-        else:
-            raise Exception(f"不支持的文件格式: {file_ext}")
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if is_binary_subtitle(data):
+            raise Exception(f"不支持二进制字幕文件（如VobSub）: {file_path}")
+        text = decode_subtitle(data)
         
-    def _parse_srt(self, file_path):
-        """解析SRT格式字幕
-        Args:
-            file_path: SRT文件路径
-        Returns:
-            pysrt.SubRipFile: 解析后的SRT字幕对象
-        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        subtitle_format = self.detect_format(text, file_ext)
         try:
-            return pysrt.open(file_path)
+            return subtitle_format.read(text)
         except Exception as e:
-            raise Exception(f"解析SRT文件失败: {str(e)}")
+            raise Exception(f"解析{subtitle_format.name}文件失败: {str(e)}")
         
-    def _parse_ass(self, file_path):
-        """解析ASS格式字幕
+    def detect_format(self, text, file_ext=""):
+        """识别字幕格式
         Args:
-            file_path: ASS文件路径
+            text: 字幕文本，只检查开头部分
+            file_ext: 文件扩展名，内容无法识别时使用
         Returns:
-            list: 解析后的ASS字幕数据列表
+            SubtitleFormat: 识别出的字幕格式
+        Raises:
+            Exception: 无法识别格式时抛出异常
         """
-        # 这里实现ASS格式解析逻辑
-        # 注意：这是一个简化实现，实际ASS格式更复杂
-        try:
-            subtitle_data = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            # 跳过[Script Info]和[V4+ Styles]部分
-            i = 0
-            while i < len(lines) and not lines[i].startswith("[Events]"):
-                i += 1
-            
-            # 跳过[Events]标题和Format行
-            if i < len(lines):
-                i += 1
-                while i < len(lines) and lines[i].startswith("Format:"):
-                    i += 1
-            
-            # 解析Dialogue行
-            while i < len(lines):
-                line = lines[i].strip()
-                if line.startswith("Dialogue:"):
-                    # 格式: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
-                    parts = line.split(",", 9)
-                    if len(parts) >= 10:
-                        start_time = parts[1]
-                        end_time = parts[2]
-                        text = parts[9]
-                        
-                        # 创建一个简单的字幕对象
-                        subtitle = type('obj', (object,), {
-                            'start': start_time,
-                            'end': end_time,
-                            'text': text
-                        })
-                        subtitle_data.append(subtitle)
-                i += 1
-            
-            return subtitle_data
-        except Exception as e:
-            raise Exception(f"解析ASS文件失败: {str(e)}")
+        prefix = text[:SNIFF_PREFIX_SIZE].lstrip("\ufeff")
+        for subtitle_format in self.formats:
+            if subtitle_format.sniff(prefix):
+                return subtitle_format
+        return self._format_for_extension(file_ext)
         
     def export_subtitle(self, subtitle_data, output_path):
         """导出字幕文件
         Args:
             subtitle_data: 字幕数据
-            output_path: 输出文件路径
+            output_path: 输出文件路径，按扩展名决定导出格式
         Raises:
             Exception: 导出失败时抛出异常
         """
         try:
             file_ext = os.path.splitext(output_path)[1].lower()
-            
-            if file_ext == ".srt":
-                self._export_srt(subtitle_data, output_path)
-            elif file_ext == ".ass":
-                self._export_ass(subtitle_data, output_path)
-            else:
-                raise Exception(f"不支持的导出格式: {file_ext}")
+            self._format_for_extension(file_ext, "导出").write(subtitle_data, output_path)
         except Exception as e:
             raise Exception(f"导出字幕失败: {str(e)}")
         
-    def _export_srt(self, subtitle_data, output_path):
-        """导出SRT格式字幕
+    def _format_for_extension(self, file_ext, action="文件"):
+        """根据扩展名查找字幕格式
         Args:
-            subtitle_data: 字幕数据
-            output_path: 输出文件路径
-        """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for i, subtitle in enumerate(subtitle_data):
-                f.write(f"{i+1}\n")
-                f.write(f"{subtitle.start} --> {subtitle.end}\n")
-                if hasattr(subtitle, 'translated_text'):
-                    f.write(f"{subtitle.translated_text}\n")
-                else:
-                    f.write(f"{subtitle.text}\n")
-                f.write("\n")
-        
-    def _export_ass(self, subtitle_data, output_path):
-        """导出ASS格式字幕
-        Args:
-            subtitle_data: 字幕数据
-            output_path: 输出文件路径
+            file_ext: 文件扩展名
+            action: 错误信息中的操作名称
+        Returns:
+            SubtitleFormat: 对应的字幕格式
+        Raises:
+            Exception: 不支持该扩展名时抛出异常
         """
-        # 简化实现，实际ASS格式更复杂
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("[Script Info]\n")
-            f.write("Title: SubtitleTranslate Export\n")
-            f.write("ScriptType: v4.00+\n")
-            f.write("WrapStyle: 0\n\n")
-            
-            f.write("[V4+ Styles]\n")
-            f.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n")
-            f.write("Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1\n\n")
-            
-            f.write("[Events]\n")
-            f.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
-            
-            for subtitle in subtitle_data:
-                text = subtitle.translated_text if hasattr(subtitle, 'translated_text') else subtitle.text
-                f.write(f"Dialogue: 0,{subtitle.start},{subtitle.end},Default,,0,0,0,,{text}\n")
\ No newline at end of file
+        for subtitle_format in self.formats:
+            if file_ext in subtitle_format.extensions:
+                return subtitle_format
+        raise Exception(f"不支持的{action}格式: {file_ext}")
@@ -1,5 +1,137 @@
 import os
+import re
+import asyncio
+import difflib
+import hashlib
+import threading
 from app.core.subtitle_parser import SubtitleParser
+from app.core.subtitle_formats import SUBTITLE_EXTENSIONS, is_binary_subtitle_file
+from app.core.subtitle_timing import SubtitleTimeline
+
+# 字幕中的格式标签：ASS覆盖标签{\...}与HTML标签<i>、<font ...>等
+_TAG_PATTERN = re.compile(r"\{[^}]*\}|<[^>]+>")
+# 文本首尾连续的格式标签，翻译后需要原样保留
+_LEADING_TAGS_PATTERN = re.compile(r"^(?:\{[^}]*\}|<[^>]+>)+")
+_TRAILING_TAGS_PATTERN = re.compile(r"(?:\{[^}]*\}|<[^>]+>)+$")
+
+def _split_tags(text):
+    """拆分字幕文本首尾的格式标签
+    只有标签全部位于首尾时才剥离；文本中间含有标签时整段原样发送，以免丢失或错配格式
+    Args:
+        text: 字幕原文
+    Returns:
+        tuple: (开头的格式标签, 需要发送翻译的文本, 结尾的格式标签)
+    """
+    stripped = text.strip()
+    leading = _LEADING_TAGS_PATTERN.match(stripped)
+    prefix = leading.group(0) if leading else ""
+    rest = stripped[len(prefix):]
+    trailing = _TRAILING_TAGS_PATTERN.search(rest)
+    suffix = trailing.group(0) if trailing else ""
+    core = rest[:len(rest) - len(suffix)]
+    if _TAG_PATTERN.search(core):
+        return "", stripped, ""
+    core = core.strip()
+    if not core:
+        return "", "", ""
+    return prefix, core, suffix
+
+def _content_hash(text):
+    """计算字幕文本的内容哈希，用于新旧版本对齐
+    Args:
+        text: 字幕原文
+    Returns:
+        bytes: 哈希值
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def _new_report():
+    """创建字符计费报告
+    Returns:
+        dict: 各项计数均为0的报告
+    """
+    return {
+        "cues": 0,              # 字幕条数
+        "total_chars": 0,       # 原文总字符数
+        "billable_chars": 0,    # 预估计费字符数
+        "chars_sent": 0,        # 实际发送的字符数
+        "saved_by_tags": 0,     # 剥离首尾格式标签节省的字符数
+        "saved_by_dedup": 0,    # 重复文本去重节省的字符数
+        "saved_by_cache": 0,    # 命中翻译缓存节省的字符数
+        "reused_cues": 0        # 增量翻译时复用旧译文的字幕条数
+    }
+
+class TranslationRun:
+    """多个字幕文件共享的翻译任务，检查整个任务的字符预算并累计字符计费报告
+    可同时交给多个SubtitleProcessor或FolderWatcher的工作线程使用
+    """
+    def __init__(self, char_budget=None, on_exceeded=None):
+        """初始化翻译任务
+        Args:
+            char_budget: 整个任务允许发送的最大字符数，None表示不限制
+            on_exceeded: 超出预算时的回调，参数为(累计报告, 本次所需字符数)，
+                返回True则继续翻译，未设置或返回False则中止该文件的翻译
+        """
+        self.char_budget = char_budget
+        self.on_budget_exceeded = on_exceeded
+        # 累计的字符计费报告，chars_sent在每次请求成功后累加
+        self.report = _new_report()
+        # 已完成（含中途失败）的文件数
+        self.files = 0
+        # 已预留但尚未发送的字符数
+        self._reserved = 0
+        self._lock = threading.Lock()
+        
+    def remaining(self):
+        """获取剩余可用的字符数
+        Returns:
+            int: 扣除已发送和已预留字符后的剩余字符数，不限制预算时返回None
+        """
+        if self.char_budget is None:
+            return None
+        with self._lock:
+            return max(self.char_budget - self.report["chars_sent"] - self._reserved, 0)
+        
+    def reserve(self, required):
+        """在文件发出任何请求之前预留字符
+        Args:
+            required: 该文件需要发送的字符数
+        Raises:
+            Exception: 超出预算且未获准继续时抛出异常
+        """
+        with self._lock:
+            used = self.report["chars_sent"] + self._reserved
+            if self.char_budget is None or used + required <= self.char_budget:
+                self._reserved += required
+                return
+            snapshot = dict(self.report)
+        # 回调可能等待用户确认，调用时不持有锁
+        if not self.on_budget_exceeded or not self.on_budget_exceeded(snapshot, required):
+            raise Exception(f"超出任务字符预算: 预算 {self.char_budget}, 已使用 {used}, 本次需要 {required}")
+        with self._lock:
+            self._reserved += required
+            
+    def record_sent(self, chars):
+        """记录一次成功发送的字符，从预留中扣除
+        Args:
+            chars: 发送的字符数
+        """
+        with self._lock:
+            self._reserved -= chars
+            self.report["chars_sent"] += chars
+            
+    def finish(self, report, unsent):
+        """文件翻译结束后释放未发送的预留并累计报告
+        Args:
+            report: 该文件的字符计费报告
+            unsent: 预留后未发送的字符数
+        """
+        with self._lock:
+            self._reserved -= unsent
+            self.files += 1
+            for key, value in report.items():
+                if key != "chars_sent":
+                    self.report[key] += value
 
 class SubtitleProcessor:
     """字幕处理器类，处理字幕的加载、翻译和导出"""
@@ -8,6 +140,32 @@ class SubtitleProcessor:
         self.parser = SubtitleParser()
         self.subtitle_data = None
         self.subtitle_file = None
+        # 单次翻译的字符预算，None表示不限制
+        self.char_budget = None
+        # 超出预算时的回调，返回True则继续翻译，否则中止
+        self.on_budget_exceeded = None
+        # 最近一次翻译的字符计费报告
+        self.last_report = None
+        # 所属的翻译任务，用于跨文件的字符预算与累计报告，None表示不属于任何任务
+        self.run = None
+        
+    def set_char_budget(self, char_budget, on_exceeded=None):
+        """设置单次翻译的字符预算
+        Args:
+            char_budget: 允许发送的最大字符数，None表示不限制
+            on_exceeded: 超出预算时的回调，参数为(当前报告, 本次所需字符数)，在发出任何请求前调用；
+                返回True则继续翻译（可在回调中等待用户确认以实现暂停），
+                未设置或返回False则中止翻译
+        """
+        self.char_budget = char_budget
+        self.on_budget_exceeded = on_exceeded
+        
+    def set_run(self, run):
+        """设置所属的翻译任务，之后的翻译同时受任务的字符预算限制并计入任务报告
+        Args:
+            run: TranslationRun实例，None表示不属于任何任务
+        """
+        self.run = run
         
     def load_subtitle(self, file_path):
         """加载字幕文件
@@ -45,13 +203,342 @@ class SubtitleProcessor:
             raise Exception("翻译API未初始化")
         
         try:
-            for subtitle in self.subtitle_data:
-                translated_text = translation_api.translate(subtitle.text, to_lang=target_language)
-                subtitle.translated_text = translated_text
+            self._translate_cues(self.subtitle_data, translation_api, target_language)
             return self.subtitle_data
         except Exception as e:
             raise Exception(f"翻译字幕失败: {str(e)}")
             
+    def translate_incremental(self, translation_api, target_language, previous_source, previous_translated=None):
+        """基于上一版字幕增量翻译当前字幕
+        按每条字幕的内容哈希对齐新旧原文，未变化的字幕直接复用旧译文，
+        只有新增或修改的字幕才会发送翻译请求；仅时间轴变化的字幕不产生任何请求
+        Args:
+            translation_api: 翻译API实例
+            target_language: 目标语言代码
+            previous_source: 上一版原文字幕，文件路径或字幕数据；也可以是translation_map返回的
+                原文到译文的映射，此时按原文逐条查找复用，不做位置对齐
+            previous_translated: 上一版译文字幕，文件路径或字幕数据，需与previous_source逐条对应；
+                为None时使用previous_source中各条字幕的translated_text
+        Returns:
+            翻译后的字幕数据
+        Raises:
+            Exception: 翻译失败时抛出异常
+        """
+        if not self.subtitle_data:
+            raise Exception("没有加载字幕数据")
+        
+        if not translation_api:
+            raise Exception("翻译API未初始化")
+        
+        try:
+            if isinstance(previous_source, dict):
+                pending = self._reuse_known(previous_source)
+                self._translate_cues(pending, translation_api, target_language, len(self.subtitle_data) - len(pending))
+                return self.subtitle_data
+            
+            old_source = self._resolve_subtitle_data(previous_source)
+            if previous_translated is None:
+                old_translations = [getattr(subtitle, "translated_text", None) for subtitle in old_source]
+            else:
+                old_translations = [subtitle.text for subtitle in self._resolve_subtitle_data(previous_translated)]
+            if len(old_translations) != len(old_source):
+                raise Exception(f"上一版原文与译文条数不一致: {len(old_source)} != {len(old_translations)}")
+            
+            pending = self._reuse_translations(old_source, old_translations)
+            self._translate_cues(pending, translation_api, target_language, len(self.subtitle_data) - len(pending))
+            return self.subtitle_data
+        except Exception as e:
+            raise Exception(f"增量翻译字幕失败: {str(e)}")
+            
+    async def translate_subtitle_async(self, translation_api, target_language):
+        """异步翻译字幕，所有待翻译文本在同一事件循环中并发请求
+        Args:
+            translation_api: 翻译API实例
+            target_language: 目标语言代码
+        Returns:
+            翻译后的字幕数据
+        Raises:
+            Exception: 翻译失败时抛出异常
+        """
+        if not self.subtitle_data:
+            raise Exception("没有加载字幕数据")
+        
+        if not translation_api:
+            raise Exception("翻译API未初始化")
+        
+        groups, report = self._plan_translation(self.subtitle_data)
+        self.last_report = report
+        
+        async def translate_one(plain_text):
+            result = await translation_api.translate_async(plain_text, to_lang=target_language)
+            if plain_text in uncached:
+                self._record_sent(report, len(plain_text))
+            return result
+        
+        try:
+            plain_texts = [plain_text for plain_text in groups if plain_text]
+            uncached = self._reserve_plan(report, plain_texts, translation_api, target_language)
+            try:
+                # 使用期间共享当前事件循环的HTTP会话，最后一个使用方结束时关闭
+                async with translation_api:
+                    results = await asyncio.gather(*[translate_one(plain_text) for plain_text in plain_texts])
+                self._assign_translations(groups, dict(zip(plain_texts, results)))
+            finally:
+                self._finish_plan(report, uncached)
+            return self.subtitle_data
+        except Exception as e:
+            raise Exception(f"翻译字幕失败: {str(e)}")
+            
+    def estimate_characters(self, translation_api=None, target_language="zh", subtitle_data=None):
+        """预估翻译的计费字符数，不发送任何请求
+        Args:
+            translation_api: 翻译API实例，提供时扣除已缓存文本的字符数
+            target_language: 目标语言代码
+            subtitle_data: 字幕数据，默认为当前加载的字幕
+        Returns:
+            dict: 字符计费报告
+        Raises:
+            Exception: 没有字幕数据时抛出异常
+        """
+        if subtitle_data is None:
+            subtitle_data = self.subtitle_data
+        if not subtitle_data:
+            raise Exception("没有加载字幕数据")
+        
+        groups, report = self._plan_translation(subtitle_data)
+        for plain_text in groups:
+            if translation_api and plain_text and translation_api.is_cached(plain_text, to_lang=target_language):
+                report["saved_by_cache"] += len(plain_text)
+        report["billable_chars"] -= report["saved_by_cache"]
+        return report
+        
+    def estimate_file(self, file_path, translation_api=None, target_language="zh"):
+        """预估单个字幕文件的计费字符数，不影响当前加载的字幕
+        Args:
+            file_path: 字幕文件路径
+            translation_api: 翻译API实例，提供时扣除已缓存文本的字符数
+            target_language: 目标语言代码
+        Returns:
+            dict: 字符计费报告
+        Raises:
+            Exception: 解析失败时抛出异常
+        """
+        subtitle_data = self.parser.parse_file(file_path)
+        if not subtitle_data:
+            return _new_report()
+        return self.estimate_characters(translation_api, target_language, subtitle_data)
+        
+    def estimate_directory(self, dir_path, translation_api=None, target_language="zh", run=None):
+        """预估目录下所有字幕文件的计费字符数
+        Args:
+            dir_path: 目录路径，递归扫描其中的字幕文件，二进制字幕不计入
+            translation_api: 翻译API实例，提供时扣除已缓存文本的字符数
+            target_language: 目标语言代码
+            run: 翻译任务，提供时检查汇总的计费字符数是否在任务剩余预算之内，默认使用所属任务
+        Returns:
+            dict: {"files": {文件路径: 报告}, "errors": {文件路径: 错误信息}, "total": 汇总报告,
+                "remaining": 任务剩余字符数，不限制时为None, "within_budget": 汇总是否在剩余预算之内}
+        Raises:
+            Exception: 目录不存在时抛出异常
+        """
+        if not os.path.isdir(dir_path):
+            raise Exception(f"目录不存在: {dir_path}")
+        
+        files = {}
+        errors = {}
+        total = _new_report()
+        for root, _, names in os.walk(dir_path):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() not in SUBTITLE_EXTENSIONS:
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    # 跳过与MicroDVD共用.sub扩展名的VobSub等二进制字幕
+                    if is_binary_subtitle_file(file_path):
+                        continue
+                    report = self.estimate_file(file_path, translation_api, target_language)
+                except Exception as e:
+                    errors[file_path] = str(e)
+                    continue
+                files[file_path] = report
+                for key in total:
+                    total[key] += report[key]
+        
+        run = run if run is not None else self.run
+        remaining = run.remaining() if run is not None else None
+        return {
+            "files": files,
+            "errors": errors,
+            "total": total,
+            "remaining": remaining,
+            "within_budget": remaining is None or total["billable_chars"] <= remaining
+        }
+        
+    def _translate_cues(self, subtitles, translation_api, target_language, reused_cues=0):
+        """翻译指定的字幕条目，记录字符计费报告
+        Args:
+            subtitles: 需要翻译的字幕列表
+            translation_api: 翻译API实例
+            target_language: 目标语言代码
+            reused_cues: 增量翻译时复用旧译文的字幕条数
+        Returns:
+            dict: 字符计费报告
+        """
+        groups, report = self._plan_translation(subtitles)
+        report["reused_cues"] = reused_cues
+        self.last_report = report
+        
+        plain_texts = [plain_text for plain_text in groups if plain_text]
+        uncached = self._reserve_plan(report, plain_texts, translation_api, target_language)
+        try:
+            translations = {}
+            for plain_text in plain_texts:
+                translations[plain_text] = translation_api.translate(plain_text, to_lang=target_language)
+                if plain_text in uncached:
+                    self._record_sent(report, len(plain_text))
+            self._assign_translations(groups, translations)
+        finally:
+            self._finish_plan(report, uncached)
+        return report
+        
+    def _reuse_translations(self, old_source, old_translations):
+        """将当前字幕与上一版原文对齐，为未变化的字幕复用旧译文
+        Args:
+            old_source: 上一版原文字幕数据
+            old_translations: 与old_source逐条对应的旧译文
+        Returns:
+            list: 需要重新翻译的字幕
+        """
+        old_hashes = [_content_hash(subtitle.text) for subtitle in old_source]
+        new_hashes = [_content_hash(subtitle.text) for subtitle in self.subtitle_data]
+        # 内容哈希到旧译文的映射，用于对齐失败但内容未变的字幕（如移动了位置）
+        known = {}
+        for content_hash, translation in zip(old_hashes, old_translations):
+            if translation is not None:
+                known.setdefault(content_hash, translation)
+        
+        pending = []
+        matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            for offset, j in enumerate(range(j1, j2)):
+                subtitle = self.subtitle_data[j]
+                if tag == "equal" and old_translations[i1 + offset] is not None:
+                    subtitle.translated_text = old_translations[i1 + offset]
+                elif new_hashes[j] in known:
+                    subtitle.translated_text = known[new_hashes[j]]
+                else:
+                    pending.append(subtitle)
+        return pending
+        
+    def _reuse_known(self, known):
+        """按原文查找已知译文，为内容未变的字幕复用
+        Args:
+            known: 原文到译文的映射
+        Returns:
+            list: 需要重新翻译的字幕
+        """
+        pending = []
+        for subtitle in self.subtitle_data:
+            translation = known.get(subtitle.text)
+            if translation is None:
+                pending.append(subtitle)
+            else:
+                subtitle.translated_text = translation
+        return pending
+        
+    def _resolve_subtitle_data(self, subtitle_data):
+        """将文件路径或字幕数据统一为字幕数据
+        Args:
+            subtitle_data: 字幕文件路径或字幕数据
+        Returns:
+            字幕数据
+        """
+        if isinstance(subtitle_data, str):
+            return self.parser.parse_file(subtitle_data)
+        return list(subtitle_data)
+        
+    def _reserve_plan(self, report, plain_texts, translation_api, target_language):
+        """在发出任何请求之前为整个翻译计划记账，并检查单次与所属任务的字符预算
+        Args:
+            report: 本次翻译的字符计费报告
+            plain_texts: 去重后待翻译的文本
+            translation_api: 翻译API实例
+            target_language: 目标语言代码
+        Returns:
+            set: 未缓存、需要发送的文本
+        Raises:
+            Exception: 超出预算且未获准继续时抛出异常
+        """
+        uncached = set()
+        required = 0
+        for plain_text in plain_texts:
+            if translation_api.is_cached(plain_text, to_lang=target_language):
+                report["saved_by_cache"] += len(plain_text)
+            else:
+                uncached.add(plain_text)
+                required += len(plain_text)
+        report["billable_chars"] -= report["saved_by_cache"]
+        if self.char_budget is not None and required > self.char_budget:
+            if not self.on_budget_exceeded or not self.on_budget_exceeded(report, required):
+                raise Exception(f"超出字符预算: 预算 {self.char_budget}, 本次需要 {required}")
+        if self.run is not None:
+            self.run.reserve(required)
+        return uncached
+        
+    def _record_sent(self, report, chars):
+        """记录一次成功发送的字符
+        Args:
+            report: 本次翻译的字符计费报告
+            chars: 发送的字符数
+        """
+        report["chars_sent"] += chars
+        if self.run is not None:
+            self.run.record_sent(chars)
+            
+    def _finish_plan(self, report, uncached):
+        """翻译结束或中途失败后，释放所属任务中未发送的预留并累计报告
+        Args:
+            report: 本次翻译的字符计费报告
+            uncached: _reserve_plan返回的需要发送的文本
+        """
+        if self.run is not None:
+            self.run.finish(report, sum(len(plain_text) for plain_text in uncached) - report["chars_sent"])
+        
+    def _assign_translations(self, groups, translations):
+        """将译文写回字幕，并恢复首尾的格式标签
+        Args:
+            groups: _plan_translation返回的分组
+            translations: {纯文本: 译文}
+        """
+        for plain_text, members in groups.items():
+            for subtitle, prefix, suffix in members:
+                if plain_text:
+                    subtitle.translated_text = prefix + translations[plain_text] + suffix
+                else:
+                    subtitle.translated_text = subtitle.text
+                    
+    def _plan_translation(self, subtitle_data):
+        """剥离首尾格式标签并按文本合并重复字幕
+        Args:
+            subtitle_data: 字幕数据
+        Returns:
+            tuple: ({纯文本: [(字幕, 开头格式标签, 结尾格式标签), ...]}, 字符计费报告)
+        """
+        report = _new_report()
+        groups = {}
+        for subtitle in subtitle_data:
+            prefix, plain_text, suffix = _split_tags(subtitle.text)
+            report["cues"] += 1
+            report["total_chars"] += len(subtitle.text)
+            report["saved_by_tags"] += len(subtitle.text) - len(plain_text)
+            if plain_text in groups:
+                report["saved_by_dedup"] += len(plain_text)
+            else:
+                groups[plain_text] = []
+                report["billable_chars"] += len(plain_text)
+            groups[plain_text].append((subtitle, prefix, suffix))
+        return groups, report
+            
     def apply_changes(self, translated_content):
         """应用用户对翻译文本的更改
         Args:
@@ -83,7 +570,40 @@ class SubtitleProcessor:
             return self.subtitle_data
         except Exception as e:
             raise Exception(f"应用更改失败: {str(e)}")
-            
+
+    def translation_map(self):
+        """获取当前字幕原文到译文的映射，可作为translate_incremental的previous_source
+        Returns:
+            dict: 原文 -> 译文，原文重复时保留第一条的译文
+        """
+        known = {}
+        for subtitle in self.subtitle_data or []:
+            translation = getattr(subtitle, "translated_text", None)
+            if translation is not None:
+                known.setdefault(subtitle.text, translation)
+        return known
+
+    def get_timeline(self):
+        """获取当前字幕的时间轴，用于平移、缩放、修正重叠和合并等调轴操作
+        Returns:
+            SubtitleTimeline: 字幕时间轴
+        Raises:
+            Exception: 没有加载字幕数据时抛出异常
+        """
+        if not self.subtitle_data:
+            raise Exception("没有加载字幕数据")
+        return SubtitleTimeline(self.subtitle_data)
+        
+    def apply_timeline(self, timeline):
+        """将调轴后的时间轴写回当前字幕
+        Args:
+            timeline: 由get_timeline获取并调整后的时间轴
+        Returns:
+            更新后的字幕数据
+        """
+        self.subtitle_data = timeline.apply()
+        return self.subtitle_data
+        
     def export_subtitle(self, output_path):
         """导出翻译后的字幕文件
         Args:
@@ -0,0 +1,197 @@
+import re
+from array import array
+import pysrt
+
+# 时间字符串格式：SRT为HH:MM:SS,mmm，WebVTT为HH:MM:SS.mmm，ASS为H:MM:SS.cc，小时部分可省略
+_TIME_PATTERN = re.compile(r"^\s*(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*$")
+
+def to_milliseconds(value):
+    """将字幕时间转换为毫秒数
+    Args:
+        value: pysrt.SubRipTime、毫秒整数或SRT/WebVTT/ASS时间字符串
+    Returns:
+        int: 毫秒数
+    Raises:
+        Exception: 无法识别的时间格式时抛出异常
+    """
+    if isinstance(value, int):
+        return value
+    if hasattr(value, "ordinal"):
+        return value.ordinal
+    match = _TIME_PATTERN.match(str(value))
+    if not match:
+        raise Exception(f"无法识别的时间格式: {value}")
+    hours, minutes, seconds, fraction = match.groups()
+    # 小数部分按位数换算为毫秒，ASS的两位小数为厘秒
+    millis = int(fraction) * 10 ** (3 - len(fraction))
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + millis
+
+def format_srt_time(ms):
+    """格式化为SRT时间字符串
+    Args:
+        ms: 毫秒数
+    Returns:
+        str: HH:MM:SS,mmm格式的时间
+    """
+    seconds, millis = divmod(max(ms, 0), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+def format_vtt_time(ms):
+    """格式化为WebVTT时间字符串
+    Args:
+        ms: 毫秒数
+    Returns:
+        str: HH:MM:SS.mmm格式的时间
+    """
+    return format_srt_time(ms).replace(",", ".")
+
+def format_ass_time(ms):
+    """格式化为ASS时间字符串
+    Args:
+        ms: 毫秒数
+    Returns:
+        str: H:MM:SS.cc格式的时间
+    """
+    centis = (max(ms, 0) + 5) // 10
+    seconds, centis = divmod(centis, 100)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}.{centis:02d}"
+
+class SubtitleTimeline:
+    """字幕时间轴类，将开始/结束时间存放在连续的毫秒整数数组中，整体进行调轴操作"""
+    def __init__(self, subtitle_data):
+        """初始化字幕时间轴
+        Args:
+            subtitle_data: 字幕数据
+        """
+        self.subtitles = list(subtitle_data)
+        self.starts = array("q", [to_milliseconds(subtitle.start) for subtitle in self.subtitles])
+        self.ends = array("q", [to_milliseconds(subtitle.end) for subtitle in self.subtitles])
+        # 每条时间轴对应的原字幕序号，合并后一条时间轴可对应多条字幕
+        self.groups = [[i] for i in range(len(self.subtitles))]
+
+    def __len__(self):
+        """返回时间轴条数"""
+        return len(self.starts)
+
+    def shift(self, offset_ms):
+        """整体平移时间轴，平移后早于0的时间截断为0
+        Args:
+            offset_ms: 偏移毫秒数，负数表示提前
+        Returns:
+            SubtitleTimeline: 自身，便于链式调用
+        """
+        self.starts = array("q", [t + offset_ms if t > -offset_ms else 0 for t in self.starts])
+        self.ends = array("q", [t + offset_ms if t > -offset_ms else 0 for t in self.ends])
+        return self
+
+    def scale(self, factor):
+        """按比例缩放时间轴
+        Args:
+            factor: 缩放系数
+        Returns:
+            SubtitleTimeline: 自身，便于链式调用
+        """
+        self.starts = array("q", [int(t * factor + 0.5) for t in self.starts])
+        self.ends = array("q", [int(t * factor + 0.5) for t in self.ends])
+        return self
+
+    def convert_framerate(self, from_fps, to_fps):
+        """帧率转换，如23.976与25之间的转换
+        Args:
+            from_fps: 字幕原本对应的帧率
+            to_fps: 目标视频帧率
+        Returns:
+            SubtitleTimeline: 自身，便于链式调用
+        """
+        if from_fps <= 0 or to_fps <= 0:
+            raise Exception(f"无效的帧率: {from_fps} -> {to_fps}")
+        return self.scale(from_fps / to_fps)
+
+    def clamp_overlaps(self, min_gap=0):
+        """修正重叠字幕，使每条字幕在下一条开始前结束
+        Args:
+            min_gap: 相邻字幕之间保留的最小间隔毫秒数
+        Returns:
+            SubtitleTimeline: 自身，便于链式调用
+        """
+        if len(self.starts) < 2:
+            return self
+        starts = self.starts
+        clamped = [
+            max(start, min(end, next_start - min_gap))
+            for start, end, next_start in zip(starts, self.ends, starts[1:])
+        ]
+        clamped.append(self.ends[-1])
+        self.ends = array("q", clamped)
+        return self
+
+    def merge_adjacent(self, max_gap=0, max_duration=None):
+        """合并间隔很短的相邻字幕
+        Args:
+            max_gap: 相邻字幕间隔不超过该毫秒数时合并
+            max_duration: 合并后的最长持续毫秒数，None表示不限制
+        Returns:
+            SubtitleTimeline: 自身，便于链式调用
+        """
+        if not self.starts:
+            return self
+        starts = array("q", [self.starts[0]])
+        ends = array("q", [self.ends[0]])
+        groups = [list(self.groups[0])]
+        for i in range(1, len(self.starts)):
+            start, end = self.starts[i], self.ends[i]
+            if start - ends[-1] <= max_gap and (max_duration is None or max(end, ends[-1]) - starts[-1] <= max_duration):
+                ends[-1] = max(end, ends[-1])
+                groups[-1].extend(self.groups[i])
+            else:
+                starts.append(start)
+                ends.append(end)
+                groups.append(list(self.groups[i]))
+        self.starts, self.ends, self.groups = starts, ends, groups
+        return self
+
+    def apply(self):
+        """将时间轴写回字幕数据
+        Returns:
+            list: 更新时间后的字幕数据，合并的字幕只保留第一条并拼接文本
+        """
+        result = []
+        for start, end, group in zip(self.starts, self.ends, self.groups):
+            subtitle = self.subtitles[group[0]]
+            if len(group) > 1:
+                self._merge_texts(subtitle, [self.subtitles[i] for i in group])
+            subtitle.start = self._convert_time(subtitle.start, start)
+            subtitle.end = self._convert_time(subtitle.end, end)
+            result.append(subtitle)
+        for i, subtitle in enumerate(result):
+            if isinstance(subtitle, pysrt.SubRipItem):
+                subtitle.index = i + 1
+        self.subtitles = result
+        self.groups = [[i] for i in range(len(result))]
+        return result
+
+    def _merge_texts(self, target, members):
+        """拼接被合并字幕的文本
+        Args:
+            target: 保留的字幕
+            members: 同组的全部字幕
+        """
+        target.text = "\n".join(member.text for member in members)
+        if all(hasattr(member, "translated_text") for member in members):
+            target.translated_text = "\n".join(member.translated_text for member in members)
+
+    def _convert_time(self, original, ms):
+        """按原有时间类型生成新的时间值
+        Args:
+            original: 原时间值
+            ms: 新的毫秒数
+        Returns:
+            与原时间值同类型的新时间
+        """
+        if isinstance(original, pysrt.SubRipTime):
+            return pysrt.SubRipTime.from_ordinal(ms)
+        return ms
@@ -1,20 +1,123 @@
 import time
+import asyncio
 import hashlib
+import hmac
 import base64
 import json
+import threading
+import itertools
+import secrets
+from collections import OrderedDict
 import requests
 
+# 缓存未命中的标记，译文可能为空字符串
+_MISSING = object()
+
+class _InFlightRequest:
+    """正在进行中的翻译请求，相同请求的调用方在此等待结果"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class _VolcRequestBuilder:
+    """火山翻译请求构造器，预先计算与密钥相关的签名材料，降低每次请求的开销"""
+    # 参考火山翻译API文档：https://www.volcengine.com/docs/4640/65067
+    PATH = "/api/v2/translate/text"
+    
+    def __init__(self, api_url, api_key, api_secret):
+        """初始化请求构造器
+        Args:
+            api_url: API地址
+            api_key: API密钥
+            api_secret: API密钥密码
+        """
+        self.config = (api_url, api_key, api_secret)
+        self.url = f"{api_url}{self.PATH}"
+        # 已载入密钥的HMAC对象，每次签名时复制使用
+        self._hmac = hmac.new(api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+        self._sign_prefix = f"POST\n{self.PATH}\n".encode("utf-8")
+        self._authorization_prefix = f"HMAC-SHA256 Credential={api_key}, SignedHeaders=content-type;x-date;x-nonce, Signature="
+        # 复用编码器，避免json.dumps每次带参数调用时重新创建
+        self._json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        # 请求头模板，每次请求复制后只填写随请求变化的字段
+        self._header_template = {
+            "X-Date": "",
+            "X-Nonce": "",
+            "X-Content-Sha256": "",
+            "Authorization": "",
+            "Content-Type": "application/json"
+        }
+        # 随机数由毫秒时间戳、实例随机前缀与递增计数组成，同一毫秒内的请求也不会重复
+        self._nonce_prefix = secrets.token_hex(4)
+        self._nonce_counter = itertools.count()
+        
+    def build(self, texts, from_lang, to_lang):
+        """构造一次翻译请求
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            tuple: (请求地址, 请求头, 序列化后的请求体bytes)
+        """
+        now = time.time()
+        timestamp = str(int(now))
+        nonce = f"{int(now * 1000)}{self._nonce_prefix}{next(self._nonce_counter)}"
+        
+        # 请求体只序列化一次，哈希与实际发送的是同一份字节
+        body = self._json_encoder.encode(
+            {"TargetLanguage": to_lang, "SourceLanguage": from_lang, "TextList": list(texts)}
+        ).encode("utf-8")
+        
+        headers = self._header_template.copy()
+        headers["X-Date"] = timestamp
+        headers["X-Nonce"] = nonce
+        headers["X-Content-Sha256"] = base64.b64encode(hashlib.sha256(body).digest()).decode("ascii")
+        headers["Authorization"] = self._authorization_prefix + self.sign(timestamp, nonce)
+        return self.url, headers, body
+        
+    def sign(self, timestamp, nonce):
+        """生成请求签名
+        Args:
+            timestamp: 时间戳
+            nonce: 随机数
+        Returns:
+            Base64编码的HMAC-SHA256签名
+        """
+        mac = self._hmac.copy()
+        mac.update(self._sign_prefix + f"{timestamp}\n{nonce}\n".encode("utf-8"))
+        return base64.b64encode(mac.digest()).decode("ascii")
+
+class _AsyncLoopState:
+    """单个事件循环内的异步请求状态，会话、信号量与进行中请求都不能跨事件循环使用"""
+    def __init__(self, max_concurrency):
+        """初始化事件循环状态
+        Args:
+            max_concurrency: 同时进行的最大请求数
+        """
+        self.session = None
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # 进行中的请求表，(text, from_lang, to_lang) -> asyncio.Future
+        self.inflight = {}
+        # 通过async with使用该API实例的调用方数量
+        self.users = 0
+
 class TranslationAPI:
-    def __init__(self, platform, api_key, api_secret):
+    def __init__(self, platform, api_key, api_secret, max_concurrency=16, cache_size=10000):
         """初始化翻译API
         Args:
             platform: 翻译平台
             api_key: API密钥
             api_secret: API密钥密码
+            max_concurrency: 异步调用时同时进行的最大请求数
+            cache_size: 翻译结果缓存的最大条数，超出时淘汰最久未使用的条目，0表示不缓存
         """
         self.platform = platform
         self.api_key = api_key
         self.api_secret = api_secret
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
         
         # 设置API端点
         if platform == "火山翻译":
@@ -22,8 +125,105 @@ class TranslationAPI:
         else:
             raise ValueError(f"不支持的翻译平台: {platform}")
         
+        # 翻译结果的LRU缓存，(text, from_lang, to_lang) -> 译文
+        self._cache = OrderedDict()
+        # 进行中的请求表，(text, from_lang, to_lang) -> _InFlightRequest
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # 火山翻译请求构造器，首次请求时创建
+        self._volc_builder = None
+        # 各事件循环的异步请求状态，event loop -> _AsyncLoopState，首次异步调用时创建
+        self._loop_states = {}
+        self.stats = {
+            "requests": 0,    # translate调用次数
+            "api_calls": 0,   # 实际发出的API请求次数
+            "cache_hits": 0,  # 命中缓存的次数
+            "coalesced": 0    # 合并到进行中请求的次数
+        }
+        
     def translate(self, text, from_lang="auto", to_lang="zh"):
         """翻译文本
+        已翻译过的文本直接返回缓存结果；相同的(text, from_lang, to_lang)
+        请求正在进行时，不再重复调用API，而是等待进行中的请求并共享其结果
+        Args:
+            text: 要翻译的文本
+            from_lang: 源语言，默认为自动检测
+            to_lang: 目标语言，默认为中文
+        Returns:
+            翻译后的文本
+        """
+        key = (text, from_lang, to_lang)
+        with self._inflight_lock:
+            self.stats["requests"] += 1
+            cached = self._cache_get(key)
+            if cached is not _MISSING:
+                self.stats["cache_hits"] += 1
+                return cached
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlightRequest()
+                self._inflight[key] = flight
+            else:
+                self.stats["coalesced"] += 1
+        
+        if not is_leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = self._call_platform(text, from_lang, to_lang)
+            with self._inflight_lock:
+                self._cache_put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self.stats["api_calls"] += 1
+                del self._inflight[key]
+            flight.event.set()
+            
+    def is_cached(self, text, from_lang="auto", to_lang="zh"):
+        """判断文本的译文是否已在缓存中
+        Args:
+            text: 要翻译的文本
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            bool: 已缓存返回True
+        """
+        with self._inflight_lock:
+            return (text, from_lang, to_lang) in self._cache
+        
+    def get_statistics(self):
+        """获取翻译请求统计信息
+        Returns:
+            dict: 包含requests、api_calls、cache_hits、coalesced计数的字典副本
+        """
+        with self._inflight_lock:
+            return dict(self.stats)
+        
+    def translate_batch(self, texts, from_lang="auto", to_lang="zh"):
+        """批量翻译文本，未缓存的文本合并为一次API请求
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言，默认为自动检测
+            to_lang: 目标语言，默认为中文
+        Returns:
+            list: 与texts一一对应的译文列表
+        """
+        results, pending = self._collect_uncached(texts, from_lang, to_lang)
+        if pending:
+            translations = self._call_platform_batch(pending, from_lang, to_lang)
+            self._store_batch(results, pending, translations, from_lang, to_lang)
+        return [results[text] for text in texts]
+        
+    async def translate_async(self, text, from_lang="auto", to_lang="zh"):
+        """异步翻译文本，缓存与进行中请求合并的行为与translate一致
         Args:
             text: 要翻译的文本
             from_lang: 源语言，默认为自动检测
@@ -31,8 +231,177 @@ class TranslationAPI:
         Returns:
             翻译后的文本
         """
+        key = (text, from_lang, to_lang)
+        state = self._get_loop_state()
+        with self._inflight_lock:
+            self.stats["requests"] += 1
+            cached = self._cache_get(key)
+            if cached is not _MISSING:
+                self.stats["cache_hits"] += 1
+                return cached
+            future = state.inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+        
+        if future is not None:
+            # shield避免某个等待方被取消时连带取消共享的请求
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        state.inflight[key] = future
+        try:
+            result = (await self._call_platform_batch_async([text], from_lang, to_lang))[0]
+            with self._inflight_lock:
+                self._cache_put(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已读取，没有其他等待方时不产生警告
+            future.exception()
+            raise
+        finally:
+            with self._inflight_lock:
+                self.stats["api_calls"] += 1
+            del state.inflight[key]
+            
+    async def translate_batch_async(self, texts, from_lang="auto", to_lang="zh"):
+        """异步批量翻译文本，未缓存的文本合并为一次API请求
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言，默认为自动检测
+            to_lang: 目标语言，默认为中文
+        Returns:
+            list: 与texts一一对应的译文列表
+        """
+        results, pending = self._collect_uncached(texts, from_lang, to_lang)
+        if pending:
+            translations = await self._call_platform_batch_async(pending, from_lang, to_lang)
+            self._store_batch(results, pending, translations, from_lang, to_lang)
+        return [results[text] for text in texts]
+        
+    async def close_async(self):
+        """关闭当前事件循环中异步请求使用的HTTP会话"""
+        loop = asyncio.get_running_loop()
+        with self._inflight_lock:
+            state = self._loop_states.pop(loop, None)
+        if state is not None and state.session is not None:
+            await state.session.close()
+            
+    async def __aenter__(self):
+        """在当前事件循环中登记一个使用方，配合async with使用"""
+        self._get_loop_state().users += 1
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        """注销使用方，最后一个使用方退出时关闭HTTP会话"""
+        state = self._get_loop_state()
+        state.users -= 1
+        if state.users <= 0:
+            await self.close_async()
+        
+    def _collect_uncached(self, texts, from_lang, to_lang):
+        """找出批量翻译中尚未缓存的文本并更新统计
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            tuple: ({原文: 已缓存的译文}, 去重后的未缓存文本列表)
+        """
+        results = {}
+        pending = []
+        with self._inflight_lock:
+            self.stats["requests"] += len(texts)
+            for text in texts:
+                cached = self._cache_get((text, from_lang, to_lang))
+                if cached is not _MISSING:
+                    self.stats["cache_hits"] += 1
+                    results[text] = cached
+                elif text not in results and text not in pending:
+                    pending.append(text)
+            if pending:
+                self.stats["api_calls"] += 1
+        return results, pending
+        
+    def _store_batch(self, results, texts, translations, from_lang, to_lang):
+        """记录并缓存批量翻译结果
+        Args:
+            results: 本次批量翻译的结果表，{原文: 译文}
+            texts: 原文列表
+            translations: 与原文一一对应的译文列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        """
+        with self._inflight_lock:
+            for text, translation in zip(texts, translations):
+                results[text] = translation
+                self._cache_put((text, from_lang, to_lang), translation)
+                
+    def _cache_get(self, key):
+        """读取缓存并标记为最近使用，调用方需持有_inflight_lock
+        Args:
+            key: (text, from_lang, to_lang)
+        Returns:
+            缓存的译文，未命中时返回_MISSING
+        """
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self._cache.move_to_end(key)
+        return value
+        
+    def _cache_put(self, key, value):
+        """写入缓存并淘汰超出容量的最久未使用条目，调用方需持有_inflight_lock
+        Args:
+            key: (text, from_lang, to_lang)
+            value: 译文
+        """
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            
+    def _call_platform(self, text, from_lang, to_lang):
+        """按平台调用对应的翻译接口
+        Args:
+            text: 要翻译的文本
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            翻译后的文本
+        """
+        return self._call_platform_batch([text], from_lang, to_lang)[0]
+        
+    def _call_platform_batch(self, texts, from_lang, to_lang):
+        """按平台调用对应的批量翻译接口
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            list: 译文列表
+        """
+        if self.platform == "火山翻译":
+            return self._volc_translate_batch(texts, from_lang, to_lang)
+        else:
+            raise ValueError(f"不支持的翻译平台: {self.platform}")
+        
+    async def _call_platform_batch_async(self, texts, from_lang, to_lang):
+        """按平台异步调用对应的批量翻译接口
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            list: 译文列表
+        """
         if self.platform == "火山翻译":
-            return self._volc_translate(text, from_lang, to_lang)
+            return await self._volc_translate_batch_async(texts, from_lang, to_lang)
         else:
             raise ValueError(f"不支持的翻译平台: {self.platform}")
         
@@ -45,82 +414,112 @@ class TranslationAPI:
         Returns:
             翻译后的文本
         """
-        # 参考火山翻译API文档：https://www.volcengine.com/docs/4640/65067
-        # 准备请求参数
-        timestamp = str(int(time.time()))
-        nonce = str(int(time.time() * 1000))
+        return self._volc_translate_batch([text], from_lang, to_lang)[0]
         
-        # 构造签名
-        signature = self._generate_volc_signature(timestamp, nonce)
-        
-        # 构造请求头
-        headers = {
-            "X-Date": timestamp,
-            "X-Nonce": nonce,
-            "X-Content-Sha256": self._compute_sha256(text),
-            "Authorization": f"HMAC-SHA256 Credential={self.api_key}, SignedHeaders=content-type;x-date;x-nonce, Signature={signature}",
-            "Content-Type": "application/json"
-        }
-        
-        # 构造请求体
-        body = {
-            "TargetLanguage": to_lang,
-            "SourceLanguage": from_lang,
-            "TextList": [text]
-        }
+    def _volc_translate_batch(self, texts, from_lang="auto", to_lang="zh"):
+        """火山翻译API批量调用
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            list: 译文列表
+        """
+        url, headers, body = self._build_volc_request(texts, from_lang, to_lang)
         
         # 发送请求
         try:
-            response = requests.post(
-                f"{self.api_url}/api/v2/translate/text",
-                headers=headers,
-                json=body
-            )
-            
-            # 处理响应
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("ResponseMetadata", {}).get("Error"):
-                    raise Exception(f"翻译API错误: {result['ResponseMetadata']['Error']['Message']}")
-                
-                translations = result.get("TranslationList", [])
-                if translations and len(translations) > 0:
-                    return translations[0].get("Translation", text)
-                else:
-                    return text
-            else:
-                raise Exception(f"翻译API请求失败: 状态码 {response.status_code}, 响应内容 {response.text}")
+            response = requests.post(url, headers=headers, data=body)
+            return self._parse_volc_response(response.status_code, response.text, texts)
         except Exception as e:
             raise Exception(f"火山翻译API调用失败: {str(e)}")
         
-    def _generate_volc_signature(self, timestamp, nonce):
-        """生成火山翻译API签名
+    async def _volc_translate_batch_async(self, texts, from_lang="auto", to_lang="zh"):
+        """火山翻译API异步批量调用
         Args:
-            timestamp: 时间戳
-            nonce: 随机数
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
         Returns:
-            签名字符串
+            list: 译文列表
         """
-        # 构造签名字符串
-        sign_str = f"POST\n/api/v2/translate/text\n{timestamp}\n{nonce}\n"
+        state = self._get_loop_state()
+        session = self._get_session(state)
+        url, headers, body = self._build_volc_request(texts, from_lang, to_lang)
         
-        # 使用HMAC-SHA256算法生成签名
-        key = self.api_secret.encode("utf-8")
-        message = sign_str.encode("utf-8")
+        # 发送请求，信号量限制同时进行的连接数
+        try:
+            async with state.semaphore:
+                async with session.post(url, headers=headers, data=body) as response:
+                    status_code = response.status
+                    content = await response.text()
+            return self._parse_volc_response(status_code, content, texts)
+        except Exception as e:
+            raise Exception(f"火山翻译API调用失败: {str(e)}")
         
-        import hmac
-        signature = hmac.new(key, message, digestmod=hashlib.sha256).digest()
+    def _get_loop_state(self):
+        """获取当前事件循环的异步请求状态，首次调用时创建，并清理已关闭事件循环的状态
+        Returns:
+            _AsyncLoopState: 当前事件循环的状态
+        """
+        loop = asyncio.get_running_loop()
+        with self._inflight_lock:
+            state = self._loop_states.get(loop)
+            if state is None:
+                for closed_loop in [other for other in self._loop_states if other.is_closed()]:
+                    del self._loop_states[closed_loop]
+                state = self._loop_states[loop] = _AsyncLoopState(self.max_concurrency)
+            return state
+        
+    def _get_session(self, state):
+        """获取事件循环内的异步HTTP会话，首次调用时创建
+        Args:
+            state: 当前事件循环的状态
+        Returns:
+            aiohttp.ClientSession: HTTP会话
+        Raises:
+            Exception: 未安装aiohttp时抛出异常
+        """
+        if state.session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise Exception("异步翻译需要安装aiohttp: pip install aiohttp")
+            state.session = aiohttp.ClientSession()
+        return state.session
         
-        # 对签名进行Base64编码
-        return base64.b64encode(signature).decode("utf-8")
+    def _build_volc_request(self, texts, from_lang, to_lang):
+        """构造火山翻译API请求，同步与异步调用共用
+        Args:
+            texts: 要翻译的文本列表
+            from_lang: 源语言
+            to_lang: 目标语言
+        Returns:
+            tuple: (请求地址, 请求头, 序列化后的请求体bytes)
+        """
+        builder = self._volc_builder
+        if builder is None or builder.config != (self.api_url, self.api_key, self.api_secret):
+            builder = self._volc_builder = _VolcRequestBuilder(self.api_url, self.api_key, self.api_secret)
+        return builder.build(texts, from_lang, to_lang)
         
-    def _compute_sha256(self, text):
-        """计算文本的SHA256哈希值
+    def _parse_volc_response(self, status_code, content, texts):
+        """解析火山翻译API响应，同步与异步调用共用
         Args:
-            text: 文本内容
+            status_code: HTTP状态码
+            content: 响应内容
+            texts: 请求的原文列表，缺少译文时原样返回
         Returns:
-            SHA256哈希值
+            list: 与texts一一对应的译文列表
         """
-        sha256 = hashlib.sha256()
-        sha256.update(text.encode("utf-8"))
-        return base64.b64encode(sha256.digest()).decode("utf-8")
\ No newline at end of file
+        if status_code != 200:
+            raise Exception(f"翻译API请求失败: 状态码 {status_code}, 响应内容 {content}")
+        
+        result = json.loads(content)
+        if result.get("ResponseMetadata", {}).get("Error"):
+            raise Exception(f"翻译API错误: {result['ResponseMetadata']['Error']['Message']}")
+        
+        translations = result.get("TranslationList", []) or []
+        return [
+            translations[i].get("Translation", text) if i < len(translations) else text
+            for i, text in enumerate(texts)
+        ]
@@ -160,7 +160,7 @@ class MainWindow(Tk):
     def select_subtitle_file(self):
         """选择字幕文件"""
         file_path = filedialog.askopenfilename(
-            filetypes=[("字幕文件", "*.srt *.ass"), ("所有文件", "*.*")]
+            filetypes=[("字幕文件", "*.srt *.ass *.ssa *.vtt *.sub"), ("所有文件", "*.*")]
         )
         if file_path:
             self.file_path_var.delete(0, "end")
@@ -209,7 +209,9 @@ class MainWindow(Tk):
             for i, subtitle in enumerate(self.subtitle_processor.subtitle_data):
                 self.translated_text.insert("end", f"{i+1}. {subtitle.translated_text}\n\n")
                 
-            messagebox.showinfo("成功", "字幕翻译完成")
+            report = self.subtitle_processor.last_report
+            saved = report["saved_by_tags"] + report["saved_by_dedup"] + report["saved_by_cache"]
+            messagebox.showinfo("成功", f"字幕翻译完成\n发送字符: {report['chars_sent']}, 节省字符: {saved}")
         except Exception as e:
             messagebox.showerror("错误", f"翻译失败: {str(e)}")
             
@@ -240,7 +242,7 @@ class MainWindow(Tk):
         
         save_path = filedialog.asksaveasfilename(
             defaultextension=".srt",
-            filetypes=[("SRT文件", "*.srt"), ("所有文件", "*.*")]
+            filetypes=[("SRT文件", "*.srt"), ("ASS文件", "*.ass"), ("SSA文件", "*.ssa"), ("WebVTT文件", "*.vtt"), ("MicroDVD文件", "*.sub"), ("所有文件", "*.*")]
         )
         
         if save_path:
@@ -1,11 +1,56 @@
 """字幕翻译工具入口文件"""
 import sys
-from app.gui.main_window import MainWindow
+import json
+import argparse
+
+def watch(folder, target_language, char_budget=None, config_file="config.json"):
+    """以监视模式运行，持续翻译文件夹中新增或修改的字幕文件
+    Args:
+        folder: 监视的文件夹路径
+        target_language: 目标语言代码
+        char_budget: 本次运行允许发送的最大字符数，None表示不限制
+        config_file: 配置文件路径
+    """
+    from app.core import TranslationAPI
+    from app.core.folder_watcher import FolderWatcher
+    from app.core.subtitle_processor import TranslationRun
+
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    translation_api = TranslationAPI(config.get("platform", "火山翻译"), config.get("api_key", ""), config.get("api_secret", ""))
+
+    run = TranslationRun(char_budget)
+    watcher = FolderWatcher(
+        folder, translation_api, target_language,
+        on_done=lambda path, output, report: print(
+            f"已翻译: {path} -> {output} (发送字符: {report['chars_sent']}, 累计发送: {run.report['chars_sent']})"
+        ),
+        on_error=lambda path, e: print(f"翻译失败: {path}: {e}", file=sys.stderr),
+        run=run
+    )
+    print(f"正在监视: {folder}，按Ctrl+C退出")
+    try:
+        watcher.run_forever()
+    except KeyboardInterrupt:
+        watcher.stop()
+    saved = run.report["saved_by_tags"] + run.report["saved_by_dedup"] + run.report["saved_by_cache"]
+    print(f"共处理 {run.files} 个文件，发送字符: {run.report['chars_sent']}，节省字符: {saved}")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="字幕翻译工具")
+    parser.add_argument("--watch", metavar="DIR", help="监视文件夹，自动翻译新增或修改的字幕文件")
+    parser.add_argument("--lang", default="zh", help="目标语言代码，默认为zh")
+    parser.add_argument("--budget", type=int, default=None, help="监视模式下本次运行允许发送的最大字符数")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.watch, args.lang, args.budget)
+        return
+
+    from app.gui.main_window import MainWindow
     app = MainWindow()
     app.mainloop()
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,133 @@
+"""文件夹监视测试：增量状态、重试与删除"""
+import os
+import tempfile
+import unittest
+
+from app.core.folder_watcher import FolderWatcher
+
+
+class _FakeAPI:
+    """记录请求的翻译API替身，failures为前几次调用抛出的异常数"""
+    def __init__(self, failures=0):
+        self.sent = []
+        self.failures = failures
+
+    def is_cached(self, text, from_lang="auto", to_lang="zh"):
+        return False
+
+    def translate(self, text, from_lang="auto", to_lang="zh"):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("network down")
+        self.sent.append(text)
+        return f"T:{text}"
+
+
+class FolderWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.folder = self._folder.name
+        self.path = os.path.join(self.folder, "a.srt")
+        self.errors = []
+        self.watchers = []
+
+    def tearDown(self):
+        for watcher in self.watchers:
+            watcher.stop()
+        self._folder.cleanup()
+
+    def _watcher(self, api, **kwargs):
+        watcher = FolderWatcher(self.folder, api, "zh", settle_time=0, max_workers=1,
+                                on_error=lambda path, e: self.errors.append(str(e)), **kwargs)
+        self.watchers.append(watcher)
+        return watcher
+
+    def _write(self, texts, path=None):
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            for i, text in enumerate(texts):
+                f.write(f"{i + 1}\n00:00:0{i},000 --> 00:00:0{i},500\n{text}\n\n")
+        # 保证修改时间变化可被检测到
+        stat = os.stat(path or self.path)
+        os.utime(path or self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def _scan(self, watcher):
+        """扫描两次（先建立索引再提交），并等待提交的文件处理完成"""
+        watcher.scan()
+        submitted = watcher.scan()
+        watcher._executor.submit(lambda: None).result()
+        return submitted
+
+    def _output(self):
+        with open(os.path.join(self.folder, "a.zh.srt"), encoding="utf-8") as f:
+            return f.read()
+
+    def test_restart_translates_only_changed_cues(self):
+        self._write(["one", "two", "three"])
+        api = _FakeAPI()
+        self._scan(self._watcher(api))
+        self.assertEqual(api.sent, ["one", "two", "three"])
+        self.assertTrue(os.path.exists(os.path.join(self.folder, "a.zh.srt.json")))
+
+        self._write(["one", "TWO", "three"])
+        restarted = _FakeAPI()
+        self._scan(self._watcher(restarted))
+        self.assertEqual(restarted.sent, ["TWO"])
+        self.assertIn("T:TWO", self._output())
+        self.assertIn("T:three", self._output())
+
+    def test_restart_skips_unchanged_content(self):
+        self._write(["one"])
+        self._scan(self._watcher(_FakeAPI()))
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 10 ** 9))
+        api = _FakeAPI()
+        self._scan(self._watcher(api))
+        self.assertEqual(api.sent, [])
+
+    def test_transient_errors_are_retried(self):
+        self._write(["one"])
+        api = _FakeAPI(failures=1)
+        watcher = self._watcher(api, retry_delay=0)
+        self._scan(watcher)
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(watcher._retries[self.path][0], 1)
+        self._scan(watcher)
+        self.assertEqual(api.sent, ["one"])
+        self.assertNotIn(self.path, watcher._retries)
+
+    def test_retry_waits_for_backoff(self):
+        self._write(["one"])
+        api = _FakeAPI(failures=1)
+        watcher = self._watcher(api, retry_delay=60)
+        self._scan(watcher)
+        self.assertEqual(watcher.scan(), [])
+        self.assertEqual(api.sent, [])
+
+    def test_parse_errors_are_not_retried(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("not a subtitle")
+        watcher = self._watcher(_FakeAPI(), retry_delay=0)
+        self._scan(watcher)
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(watcher.scan(), [])
+        self.assertNotIn(self.path, watcher._retries)
+
+    def test_deleted_file_is_not_written_back(self):
+        self._write(["one"])
+        watcher = self._watcher(_FakeAPI())
+        watcher.scan()
+        signature = watcher._index[self.path][:2]
+        watcher._index.pop(self.path)
+        watcher._process_file(self.path, signature)
+        self.assertEqual(watcher._processed, {})
+        self.assertEqual(watcher._previous, {})
+
+    def test_binary_vobsub_is_skipped(self):
+        with open(os.path.join(self.folder, "movie.sub"), "wb") as f:
+            f.write(b"\x00\x00\x01\xba" + bytes(range(256)))
+        watcher = self._watcher(_FakeAPI())
+        self.assertEqual(self._scan(watcher), [])
+        self.assertEqual(self.errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
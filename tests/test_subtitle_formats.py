@@ -0,0 +1,194 @@
+"""字幕格式识别、编码检测与读写测试"""
+import os
+import tempfile
+import unittest
+
+from app.core.subtitle_formats import detect_encoding, decode_subtitle, ENCODING_PREFIX_SIZE, SubtitleFormat
+from app.core.subtitle_parser import SubtitleParser
+from app.core.subtitle_timing import to_milliseconds
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _srt(texts):
+    return "".join(f"{i + 1}\n00:00:0{i},000 --> 00:00:0{i},500\n{text}\n\n" for i, text in enumerate(texts))
+
+
+class EncodingDetectionTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = SubtitleParser()
+
+    def _parse_fixture(self, name):
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            data = f.read()
+        return detect_encoding(data), [subtitle.text for subtitle in self.parser.parse_file(os.path.join(FIXTURES, name))]
+
+    def test_cp932_katakana(self):
+        encoding, texts = self._parse_fixture("ja_katakana.cp932.srt")
+        self.assertEqual(encoding, "cp932")
+        self.assertEqual(texts[:2], ["ソフトウェアのテストを開始します", "データベースに接続できません"])
+
+    def test_cp932_kanji_only(self):
+        encoding, texts = self._parse_fixture("ja_kanji.cp932.srt")
+        self.assertEqual(encoding, "cp932")
+        self.assertEqual(texts[0], "日本語表示能力検定試験")
+
+    def test_gbk(self):
+        encoding, texts = self._parse_fixture("zh.gbk.srt")
+        self.assertEqual(encoding, "gb18030")
+        self.assertEqual(texts[0], "中文字幕测试，你好世界。")
+
+    def test_cp1252(self):
+        encoding, texts = self._parse_fixture("fr.cp1252.srt")
+        self.assertEqual(encoding, "cp1252")
+        self.assertEqual(texts[1], "It’s “quoted” — Größe")
+
+    def test_utf8_and_bom(self):
+        text = _srt(["你好"])
+        self.assertEqual(detect_encoding(text.encode("utf-8")), "utf-8")
+        self.assertEqual(detect_encoding(b"\xef\xbb\xbf" + text.encode("utf-8")), "utf-8-sig")
+        self.assertEqual(detect_encoding(text.encode("utf-16")), "utf-16")
+
+    def test_non_ascii_after_detection_prefix_is_decoded_strictly(self):
+        padding = _srt(["plain ascii line"] * 2000)
+        self.assertGreater(len(padding), ENCODING_PREFIX_SIZE)
+        text = decode_subtitle((padding + "9999\n00:09:00,000 --> 00:09:01,000\n中文字幕测试\n\n").encode("gbk"))
+        self.assertTrue(text.endswith("中文字幕测试\n\n"))
+        self.assertNotIn("�", text)
+
+    def test_binary_vobsub_is_rejected(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "movie.sub")
+            with open(path, "wb") as f:
+                f.write(b"\x00\x00\x01\xba" + bytes(range(256)) * 8)
+            with self.assertRaises(Exception):
+                self.parser.parse_file(path)
+
+
+ASS_SAMPLE = """[Script Info]
+; Script generated by Aegisub
+Title: Sample
+ScriptType: v4.00+
+PlayResX: 1920
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Sign,Arial,40,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,8,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Comment: 0,0:00:00.00,0:00:01.00,Sign,,0,0,0,,TL note, keep me
+Dialogue: 2,0:00:01.00,0:00:02.50,Sign,Bob,5,6,7,Scroll up,Hello, world\\Nsecond
+Comment: 0,0:00:05.00,0:00:06.00,Sign,,0,0,0,,trailing
+
+[Fonts]
+fontname: sample.ttf
+M3=!aaa
+"""
+
+VTT_SAMPLE = """WEBVTT - Sample
+Kind: captions
+Language: en
+
+STYLE
+::cue { color: yellow }
+
+intro
+00:00:01.000 --> 00:00:02.000 align:start
+Hello
+
+00:00:03.000 --> 00:00:04.000
+World
+"""
+
+
+class SubtitleFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = SubtitleParser()
+        self._folder = tempfile.TemporaryDirectory()
+        self.folder = self._folder.name
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _export(self, subtitle_data, name):
+        path = os.path.join(self.folder, name)
+        self.parser.export_subtitle(subtitle_data, path)
+        with open(path, encoding="utf-8") as f:
+            return path, f.read()
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SubtitleFormat()
+
+    def test_sniffing_ignores_extension(self):
+        samples = {
+            "WebVTT": VTT_SAMPLE,
+            "ASS": ASS_SAMPLE,
+            "SSA": "[Script Info]\nScriptType: v4.00\n\n[V4 Styles]\n",
+            "SRT": _srt(["Hello"]),
+            "MicroDVD": "{1}{1}25\n{25}{50}Hello\n",
+        }
+        for name, text in samples.items():
+            self.assertEqual(self.parser.detect_format(text, ".txt").name, name)
+        self.assertEqual(self.parser.detect_format("", ".vtt").name, "WebVTT")
+        with self.assertRaises(Exception):
+            self.parser.detect_format("", ".txt")
+
+    def test_srt_round_trip(self):
+        subtitles = self.parser.parse_file(self._write("a.srt", _srt(["Hello\nthere", "World"])))
+        subtitles[0].translated_text = "你好"
+        path, _ = self._export(subtitles, "out.srt")
+        self.assertEqual([subtitle.text for subtitle in self.parser.parse_file(path)], ["你好", "World"])
+
+    def test_vtt_keeps_header_and_identifiers(self):
+        subtitles = self.parser.parse_file(self._write("a.vtt", VTT_SAMPLE))
+        self.assertEqual([(subtitle.start, subtitle.end, subtitle.text) for subtitle in subtitles],
+                         [(1000, 2000, "Hello"), (3000, 4000, "World")])
+        subtitles[0].translated_text = "你好"
+        _, text = self._export(subtitles, "out.vtt")
+        self.assertTrue(text.startswith("WEBVTT - Sample\nKind: captions\nLanguage: en\n\nSTYLE\n::cue { color: yellow }\n\n"))
+        self.assertIn("intro\n00:00:01.000 --> 00:00:02.000 align:start\n你好\n", text)
+
+    def test_ass_keeps_fields_styles_comments_and_sections(self):
+        subtitles = self.parser.parse_file(self._write("a.ass", ASS_SAMPLE))
+        self.assertEqual(len(subtitles), 1)
+        self.assertEqual(subtitles[0].text, "Hello, world\nsecond")
+        self.assertEqual(subtitles[0].fields["Style"], "Sign")
+        subtitles[0].translated_text = "你好\n第二行"
+        _, text = self._export(subtitles, "out.ass")
+        expected = ASS_SAMPLE.replace("Hello, world\\Nsecond", "你好\\N第二行")
+        self.assertEqual(text, expected)
+
+    def test_ass_to_ssa_uses_ssa_layout(self):
+        subtitles = self.parser.parse_file(self._write("a.ass", ASS_SAMPLE))
+        path, text = self._export(subtitles, "out.ssa")
+        self.assertIn("[V4 Styles]", text)
+        self.assertIn("Dialogue: Marked=0,0:00:01.00,0:00:02.50,Sign,Bob,5,6,7,Scroll up,Hello, world\\Nsecond\n", text)
+        self.assertNotIn("Comment:", text)
+        self.assertEqual([subtitle.text for subtitle in self.parser.parse_file(path)], ["Hello, world\nsecond"])
+
+    def test_microdvd_keeps_source_frame_rate(self):
+        subtitles = self.parser.parse_file(self._write("a.sub", "{1}{1}25\n{25}{50}Hello|there\n"))
+        self.assertEqual([(subtitle.start, subtitle.end, subtitle.text) for subtitle in subtitles], [(1000, 2000, "Hello\nthere")])
+        path, text = self._export(subtitles, "out.sub")
+        self.assertEqual(text, "{1}{1}25\n{25}{50}Hello|there\n")
+        self.assertEqual([(subtitle.start, subtitle.end) for subtitle in self.parser.parse_file(path)], [(1000, 2000)])
+
+    def test_conversion_between_formats(self):
+        subtitles = self.parser.parse_file(self._write("a.srt", _srt(["Line, with comma\nsecond"])))
+        for name in ("out.vtt", "out.ass", "out.ssa", "out.sub"):
+            path, _ = self._export(subtitles, name)
+            converted = self.parser.parse_file(path)
+            self.assertEqual(converted[0].text, "Line, with comma\nsecond")
+            self.assertAlmostEqual(to_milliseconds(converted[0].end), 500, delta=50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""字幕处理器测试：字符计费、预算与增量翻译"""
+import unittest
+
+from app.core.subtitle_formats import SubtitleCue
+from app.core.subtitle_processor import SubtitleProcessor, TranslationRun
+
+
+class _FakeAPI:
+    """记录请求的翻译API替身，fail_on中的文本翻译失败"""
+    def __init__(self, fail_on=()):
+        self.sent = []
+        self.cache = {}
+        self.fail_on = set(fail_on)
+
+    def is_cached(self, text, from_lang="auto", to_lang="zh"):
+        return (text, to_lang) in self.cache
+
+    def translate(self, text, from_lang="auto", to_lang="zh"):
+        if (text, to_lang) in self.cache:
+            return self.cache[(text, to_lang)]
+        if text in self.fail_on:
+            raise Exception("network down")
+        self.sent.append(text)
+        self.cache[(text, to_lang)] = f"T:{text}"
+        return f"T:{text}"
+
+
+def _cues(texts, start=0):
+    return [SubtitleCue((start + i) * 1000, (start + i) * 1000 + 500, text) for i, text in enumerate(texts)]
+
+
+def _processor(texts, run=None):
+    processor = SubtitleProcessor()
+    processor.subtitle_data = _cues(texts)
+    processor.set_run(run)
+    return processor
+
+
+class CharacterBudgetTest(unittest.TestCase):
+    def test_report_counts_tags_dedup_and_cache(self):
+        api = _FakeAPI()
+        api.cache[("cached", "zh")] = "T:cached"
+        processor = _processor(["<i>Hello</i>", "Hello", "cached", "{\\an8}"])
+        processor.translate_subtitle(api, "zh")
+        report = processor.last_report
+        self.assertEqual(api.sent, ["Hello"])
+        self.assertEqual(report["chars_sent"], 5)
+        self.assertEqual(report["saved_by_dedup"], 5)
+        self.assertEqual(report["saved_by_cache"], 6)
+        self.assertEqual(report["saved_by_tags"], 7 + 6)
+        self.assertEqual(report["billable_chars"], 5)
+        self.assertEqual([cue.translated_text for cue in processor.subtitle_data],
+                         ["<i>T:Hello</i>", "T:Hello", "T:cached", "{\\an8}"])
+
+    def test_per_call_budget_aborts_before_sending(self):
+        api = _FakeAPI()
+        processor = _processor(["one", "two"])
+        processor.set_char_budget(5)
+        with self.assertRaises(Exception):
+            processor.translate_subtitle(api, "zh")
+        self.assertEqual(api.sent, [])
+
+    def test_chars_sent_counts_only_successful_requests(self):
+        api = _FakeAPI(fail_on={"three"})
+        run = TranslationRun()
+        processor = _processor(["one", "two", "three", "four"], run)
+        with self.assertRaises(Exception):
+            processor.translate_subtitle(api, "zh")
+        self.assertEqual(processor.last_report["chars_sent"], 6)
+        self.assertEqual(run.report["chars_sent"], 6)
+        self.assertEqual(run.files, 1)
+        self.assertIsNone(run.remaining())
+
+    def test_run_budget_is_shared_across_files(self):
+        api = _FakeAPI()
+        run = TranslationRun(char_budget=10)
+        _processor(["12345"], run).translate_subtitle(api, "zh")
+        _processor(["abcd"], run).translate_subtitle(api, "zh")
+        self.assertEqual(run.remaining(), 1)
+        with self.assertRaises(Exception):
+            _processor(["xy"], run).translate_subtitle(api, "zh")
+        self.assertEqual(api.sent, ["12345", "abcd"])
+        self.assertEqual(run.report["chars_sent"], 9)
+        self.assertEqual(run.report["cues"], 2)
+        self.assertEqual(run.files, 2)
+
+    def test_run_budget_callback_can_allow_overrun(self):
+        api = _FakeAPI()
+        asked = []
+        run = TranslationRun(char_budget=2, on_exceeded=lambda report, required: asked.append(required) or True)
+        _processor(["hello"], run).translate_subtitle(api, "zh")
+        self.assertEqual(asked, [5])
+        self.assertEqual(run.report["chars_sent"], 5)
+        self.assertEqual(run.remaining(), 0)
+
+
+class IncrementalTranslationTest(unittest.TestCase):
+    def _previous(self, texts, translations=None):
+        subtitles = _cues(texts)
+        for subtitle, translation in zip(subtitles, translations or [f"old:{text}" for text in texts]):
+            subtitle.translated_text = translation
+        return subtitles
+
+    def _incremental(self, texts, previous, start=0, **kwargs):
+        api = _FakeAPI()
+        processor = SubtitleProcessor()
+        processor.subtitle_data = _cues(texts, start)
+        processor.translate_incremental(api, "zh", previous, **kwargs)
+        return api, processor
+
+    def test_timing_only_change_sends_nothing(self):
+        previous = self._previous(["one", "two", "three"])
+        api, processor = self._incremental(["one", "two", "three"], previous, start=5)
+        self.assertEqual(api.sent, [])
+        self.assertEqual([subtitle.translated_text for subtitle in processor.subtitle_data],
+                         ["old:one", "old:two", "old:three"])
+        self.assertEqual(processor.last_report["reused_cues"], 3)
+        self.assertEqual(processor.last_report["chars_sent"], 0)
+
+    def test_only_edited_and_inserted_cues_are_sent(self):
+        previous = self._previous(["one", "two", "three"])
+        api, processor = self._incremental(["one", "new", "TWO", "three"], previous)
+        self.assertEqual(sorted(api.sent), ["TWO", "new"])
+        self.assertEqual([subtitle.translated_text for subtitle in processor.subtitle_data],
+                         ["old:one", "T:new", "T:TWO", "old:three"])
+        self.assertEqual(processor.last_report["reused_cues"], 2)
+
+    def test_moved_cue_reuses_translation(self):
+        previous = self._previous(["one", "two", "three"])
+        api, processor = self._incremental(["three", "one", "two"], previous)
+        self.assertEqual(api.sent, [])
+        self.assertEqual([subtitle.translated_text for subtitle in processor.subtitle_data],
+                         ["old:three", "old:one", "old:two"])
+
+    def test_aligned_duplicates_keep_their_own_translations(self):
+        previous = self._previous(["yes", "no", "yes"], ["是", "不", "好的"])
+        api, processor = self._incremental(["yes", "no", "yes", "maybe"], previous)
+        self.assertEqual(api.sent, ["maybe"])
+        self.assertEqual([subtitle.translated_text for subtitle in processor.subtitle_data],
+                         ["是", "不", "好的", "T:maybe"])
+
+    def test_separate_translated_data(self):
+        source = _cues(["one", "two"])
+        translated = _cues(["一", "二"])
+        api, processor = self._incremental(["one", "two!"], source, previous_translated=translated)
+        self.assertEqual(api.sent, ["two!"])
+        self.assertEqual(processor.subtitle_data[0].translated_text, "一")
+        with self.assertRaises(Exception):
+            self._incremental(["one"], source, previous_translated=_cues(["一"]))
+
+    def test_translation_map_round_trip(self):
+        api, processor = self._incremental(["one", "two"], self._previous(["one", "two"]))
+        known = processor.translation_map()
+        self.assertEqual(known, {"one": "old:one", "two": "old:two"})
+        api, processor = self._incremental(["two", "three"], known)
+        self.assertEqual(api.sent, ["three"])
+        self.assertEqual(processor.last_report["reused_cues"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""字幕时间轴测试：时间换算与平移、缩放、修正重叠、合并"""
+import unittest
+
+import pysrt
+
+from app.core.subtitle_formats import SubtitleCue
+from app.core.subtitle_timing import (
+    SubtitleTimeline, to_milliseconds, format_srt_time, format_vtt_time, format_ass_time
+)
+
+
+def _cues(spans, texts=None):
+    texts = texts or [f"line {i}" for i in range(len(spans))]
+    return [SubtitleCue(start, end, text) for (start, end), text in zip(spans, texts)]
+
+
+def _spans(subtitles):
+    return [(to_milliseconds(subtitle.start), to_milliseconds(subtitle.end)) for subtitle in subtitles]
+
+
+class TimeConversionTest(unittest.TestCase):
+    def test_to_milliseconds(self):
+        self.assertEqual(to_milliseconds(1500), 1500)
+        self.assertEqual(to_milliseconds(pysrt.SubRipTime(0, 1, 2, 345)), 62345)
+        self.assertEqual(to_milliseconds("01:02:03,456"), 3723456)
+        self.assertEqual(to_milliseconds("00:01.500"), 1500)
+        self.assertEqual(to_milliseconds("1:02:03.45"), 3723450)
+        with self.assertRaises(Exception):
+            to_milliseconds("soon")
+
+    def test_formatting(self):
+        self.assertEqual(format_srt_time(3723456), "01:02:03,456")
+        self.assertEqual(format_vtt_time(3723456), "01:02:03.456")
+        self.assertEqual(format_ass_time(3723456), "1:02:03.46")
+        self.assertEqual(format_srt_time(-5), "00:00:00,000")
+
+
+class SubtitleTimelineTest(unittest.TestCase):
+    def test_shift_clamps_at_zero(self):
+        subtitles = _cues([(500, 1500), (2000, 3000)])
+        timeline = SubtitleTimeline(subtitles).shift(-1000)
+        self.assertEqual(_spans(timeline.apply()), [(0, 500), (1000, 2000)])
+
+    def test_scale_and_framerate(self):
+        subtitles = _cues([(1000, 2000)])
+        self.assertEqual(_spans(SubtitleTimeline(subtitles).scale(2).apply()), [(2000, 4000)])
+        subtitles = _cues([(25000, 50000)])
+        converted = SubtitleTimeline(subtitles).convert_framerate(25, 23.976).apply()
+        self.assertEqual(_spans(converted), [(26068, 52135)])
+        with self.assertRaises(Exception):
+            SubtitleTimeline(subtitles).convert_framerate(0, 25)
+
+    def test_clamp_overlaps(self):
+        subtitles = _cues([(0, 1500), (1000, 2000), (3000, 4000)])
+        self.assertEqual(_spans(SubtitleTimeline(subtitles).clamp_overlaps(min_gap=100).apply()),
+                         [(0, 900), (1000, 2000), (3000, 4000)])
+
+    def test_clamp_never_ends_before_start(self):
+        subtitles = _cues([(1000, 3000), (1000, 2000)])
+        self.assertEqual(_spans(SubtitleTimeline(subtitles).clamp_overlaps(min_gap=100).apply()),
+                         [(1000, 1000), (1000, 2000)])
+
+    def test_merge_adjacent_joins_texts_and_translations(self):
+        subtitles = _cues([(0, 1000), (1050, 2000), (5000, 6000)], ["a", "b", "c"])
+        for subtitle in subtitles:
+            subtitle.translated_text = subtitle.text.upper()
+        merged = SubtitleTimeline(subtitles).merge_adjacent(max_gap=100).apply()
+        self.assertEqual(_spans(merged), [(0, 2000), (5000, 6000)])
+        self.assertEqual([(subtitle.text, subtitle.translated_text) for subtitle in merged],
+                         [("a\nb", "A\nB"), ("c", "C")])
+
+    def test_merge_respects_max_duration(self):
+        subtitles = _cues([(0, 1000), (1000, 2000), (2000, 3000)])
+        merged = SubtitleTimeline(subtitles).merge_adjacent(max_gap=0, max_duration=2000).apply()
+        self.assertEqual(_spans(merged), [(0, 2000), (2000, 3000)])
+
+    def test_srt_items_keep_type_and_are_renumbered(self):
+        subtitles = pysrt.from_string(
+            "1\n00:00:01,000 --> 00:00:02,000\na\n\n2\n00:00:02,000 --> 00:00:03,000\nb\n\n"
+            "3\n00:00:05,000 --> 00:00:06,000\nc\n"
+        )
+        result = SubtitleTimeline(subtitles).shift(500).merge_adjacent().apply()
+        self.assertTrue(all(isinstance(subtitle.start, pysrt.SubRipTime) for subtitle in result))
+        self.assertEqual([subtitle.index for subtitle in result], [1, 2])
+        self.assertEqual(_spans(result), [(1500, 3500), (5500, 6500)])
+
+    def test_apply_can_be_chained_again(self):
+        timeline = SubtitleTimeline(_cues([(0, 1000), (1000, 2000)]))
+        timeline.merge_adjacent().apply()
+        self.assertEqual(len(timeline), 1)
+        self.assertEqual(_spans(timeline.shift(100).apply()), [(100, 2100)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""同步翻译接口测试：并发请求合并、统计、缓存与请求签名"""
+import base64
+import hashlib
+import json
+import threading
+import time
+import unittest
+
+from app.core.translation import TranslationAPI, _VolcRequestBuilder
+
+
+class TranslationCoalescingTest(unittest.TestCase):
+    def setUp(self):
+        self.api = TranslationAPI("火山翻译", "key", "secret")
+        self.calls = []
+        self.api._call_platform = self._call_platform
+        self.waiters = 0
+        self.fail = False
+
+    def _call_platform(self, text, from_lang, to_lang):
+        self.calls.append((text, from_lang, to_lang))
+        # 等待其他线程都加入同一个进行中的请求后再返回
+        deadline = time.monotonic() + 5
+        while self.api.get_statistics()["coalesced"] < self.waiters and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if self.fail:
+            raise Exception("boom")
+        return f"{to_lang}:{text}"
+
+    def _run_threads(self, count, text="hello"):
+        self.waiters = count - 1
+        results = [None] * count
+
+        def worker(i):
+            try:
+                results[i] = self.api.translate(text)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        results = self._run_threads(20)
+        self.assertEqual(results, ["zh:hello"] * 20)
+        self.assertEqual(len(self.calls), 1)
+        stats = self.api.get_statistics()
+        self.assertEqual(stats["requests"], 20)
+        self.assertEqual(stats["api_calls"], 1)
+        self.assertEqual(stats["coalesced"], 19)
+        self.assertEqual(stats["cache_hits"], 0)
+
+    def test_error_reaches_every_waiter_and_is_not_cached(self):
+        self.fail = True
+        results = self._run_threads(5)
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(all(isinstance(result, Exception) and "boom" in str(result) for result in results))
+        self.assertFalse(self.api.is_cached("hello"))
+
+        self.fail = False
+        self.waiters = 0
+        self.assertEqual(self.api.translate("hello"), "zh:hello")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_cache_hits_and_language_keys(self):
+        self.assertEqual(self.api.translate("hi"), "zh:hi")
+        self.assertEqual(self.api.translate("hi"), "zh:hi")
+        self.assertEqual(self.api.translate("hi", to_lang="en"), "en:hi")
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.api.get_statistics()["cache_hits"], 1)
+        self.assertTrue(self.api.is_cached("hi", to_lang="en"))
+
+    def test_cache_is_bounded(self):
+        api = TranslationAPI("火山翻译", "key", "secret", cache_size=2)
+        api._call_platform = self._call_platform
+        for text in ("a", "b", "a", "c"):
+            api.translate(text)
+        self.assertTrue(api.is_cached("a"))
+        self.assertFalse(api.is_cached("b"))
+        self.assertTrue(api.is_cached("c"))
+
+
+class VolcRequestBuilderTest(unittest.TestCase):
+    def test_body_hash_and_unique_nonces(self):
+        builder = _VolcRequestBuilder("https://example.invalid", "key", "secret")
+        url, headers, body = builder.build(["你好", "world"], "auto", "en")
+        self.assertEqual(url, "https://example.invalid/api/v2/translate/text")
+        self.assertEqual(json.loads(body), {"TargetLanguage": "en", "SourceLanguage": "auto", "TextList": ["你好", "world"]})
+        self.assertEqual(headers["X-Content-Sha256"], base64.b64encode(hashlib.sha256(body).digest()).decode("ascii"))
+        self.assertEqual(headers["Content-Type"], "application/json")
+        self.assertTrue(headers["Authorization"].endswith(builder.sign(headers["X-Date"], headers["X-Nonce"])))
+        nonces = {builder.build(["x"], "auto", "zh")[1]["X-Nonce"] for _ in range(1000)}
+        self.assertEqual(len(nonces), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
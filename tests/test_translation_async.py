@@ -0,0 +1,162 @@
+"""异步翻译接口测试，使用本地aiohttp桩服务器模拟火山翻译API"""
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import unittest
+
+from app.core.translation import TranslationAPI
+from app.core.subtitle_processor import SubtitleProcessor
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+
+class _StubServer:
+    """在独立线程的事件循环中运行的翻译API桩服务器"""
+    def __init__(self):
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post("/api/v2/translate/text", self._handle)
+        runner = web.AppRunner(app)
+        self.loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+
+    async def _handle(self, request):
+        body = await request.read()
+        expected = base64.b64encode(hashlib.sha256(body).digest()).decode("ascii")
+        if request.headers.get("X-Content-Sha256") != expected:
+            return web.Response(status=400, text="content hash mismatch")
+        payload = json.loads(body)
+        self.requests.append(payload)
+        # 留出时间让相同的并发请求合并
+        await asyncio.sleep(0.05)
+        if any("FAIL" in text for text in payload["TextList"]):
+            return web.json_response({"ResponseMetadata": {"Error": {"Message": "boom"}}})
+        return web.json_response({
+            "TranslationList": [{"Translation": f"{payload['TargetLanguage']}:{text}"} for text in payload["TextList"]]
+        })
+
+
+class _Cue:
+    def __init__(self, text):
+        self.start = 0
+        self.end = 1000
+        self.text = text
+
+
+@unittest.skipIf(web is None, "需要安装aiohttp")
+class TranslationAsyncTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _StubServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.api = TranslationAPI("火山翻译", "key", "secret")
+        self.api.api_url = f"http://127.0.0.1:{self.server.port}"
+
+    def test_concurrent_identical_requests_are_coalesced(self):
+        async def run():
+            async with self.api:
+                return await asyncio.gather(*[self.api.translate_async("hello") for _ in range(50)])
+
+        results = asyncio.run(run())
+        self.assertEqual(results, ["zh:hello"] * 50)
+        self.assertEqual(len(self.server.requests), 1)
+        stats = self.api.get_statistics()
+        self.assertEqual(stats["api_calls"], 1)
+        self.assertEqual(stats["coalesced"], 49)
+
+    def test_batch_sends_unique_uncached_texts_once(self):
+        async def run():
+            async with self.api:
+                first = await self.api.translate_batch_async(["a", "b", "a"], to_lang="en")
+                second = await self.api.translate_batch_async(["b", "a"], to_lang="en")
+                return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, ["en:a", "en:b", "en:a"])
+        self.assertEqual(second, ["en:b", "en:a"])
+        self.assertEqual([request["TextList"] for request in self.server.requests], [["a", "b"]])
+
+    def test_errors_propagate_to_all_waiters(self):
+        async def run():
+            async with self.api:
+                return await asyncio.gather(
+                    *[self.api.translate_async("FAIL") for _ in range(3)], return_exceptions=True
+                )
+
+        results = asyncio.run(run())
+        self.assertEqual(len(self.server.requests), 1)
+        for result in results:
+            self.assertIsInstance(result, Exception)
+            self.assertIn("boom", str(result))
+        self.assertFalse(self.api.is_cached("FAIL"))
+
+    def test_api_can_be_reused_across_event_loops(self):
+        async def run(text):
+            async with self.api:
+                return await self.api.translate_async(text)
+
+        self.assertEqual(asyncio.run(run("one")), "zh:one")
+        self.assertEqual(asyncio.run(run("two")), "zh:two")
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.api._loop_states, {})
+
+    def test_close_async_releases_session_without_async_with(self):
+        async def run():
+            result = await self.api.translate_async("three")
+            await self.api.close_async()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "zh:three")
+        self.assertEqual(self.api._loop_states, {})
+
+    def test_translate_subtitle_async_closes_session(self):
+        processor = SubtitleProcessor()
+        processor.subtitle_data = [_Cue("<i>Hi</i>"), _Cue("there"), _Cue("<i>Hi</i>")]
+
+        asyncio.run(processor.translate_subtitle_async(self.api, "ja"))
+
+        self.assertEqual([cue.translated_text for cue in processor.subtitle_data], ["<i>ja:Hi</i>", "ja:there", "<i>ja:Hi</i>"])
+        self.assertEqual(sorted(text for request in self.server.requests for text in request["TextList"]), ["Hi", "there"])
+        self.assertEqual(self.api._loop_states, {})
+
+    def test_sync_path_sends_matching_content_hash(self):
+        self.assertEqual(self.api.translate_batch(["x", "y"]), ["zh:x", "zh:y"])
+        self.assertEqual(self.api.translate("x"), "zh:x")
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()